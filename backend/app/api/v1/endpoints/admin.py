@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.db.session import get_db
-from app.models import User, Resume, CreditTransaction
+from app.models import User, Resume, CreditTransaction, RenderBatch, RenderBatchStatus
 from app.api.v1.endpoints.upload import get_current_user
+from app.core.queue import job_queue
+from app.services.analysis_cache import analysis_cache
+from app.services.llm_clients import llm_client_pool
+from app.services.llm_resilience import circuit_breakers, hedger, llm_retrier
+from app.services.llm_scheduler import llm_scheduler
+from app.services.bulk_render import batch_in_progress, batch_progress, create_render_batch, lease_is_live, run_render_batch
 from typing import Optional
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+job_queue.register("rerender", run_render_batch)
+
 def require_superuser(current_user: User = Depends(get_current_user)):
     """Dependency to require superuser access."""
     if not current_user.is_superuser:
@@ -155,3 +163,88 @@ def list_all_resumes(
             for r in resumes
         ]
     }
+
+@router.get("/queue")
+async def get_queue_stats(current_user: User = Depends(require_superuser)):
+    """Job queue depth per queue (ready, in flight, dead-lettered)."""
+    return {
+        "enabled": job_queue.enabled,
+        "queues": await job_queue.stats()
+    }
+
+@router.get("/cache")
+async def get_cache_stats(current_user: User = Depends(require_superuser)):
+    """Analysis result cache hit/miss counters."""
+    return await analysis_cache.stats()
+
+@router.get("/llm")
+async def get_llm_stats(current_user: User = Depends(require_superuser)):
+    """LLM provider retry/give-up counters, circuit states, hedging, scheduler queues and client pool occupancy."""
+    return {
+        "retries": await llm_retrier.stats(),
+        "circuits": circuit_breakers.stats(),
+        "hedging": hedger.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "client_pool": llm_client_pool.stats()
+    }
+
+@router.post("/rerender")
+async def start_rerender(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_superuser),
+    db: Session = Depends(get_db)
+):
+    """Re-render the PDF of every completed resume (after a theme/layout change)."""
+    # A RUNNING batch whose lease expired was interrupted (resume it instead)
+    unfinished = db.query(RenderBatch).filter(
+        RenderBatch.status.in_([RenderBatchStatus.PENDING, RenderBatchStatus.RUNNING])
+    ).all()
+    running = next((b for b in unfinished if batch_in_progress(b)), None)
+    if running:
+        raise HTTPException(status_code=409, detail=f"Render batch {running.id} is already in progress")
+    
+    batch = create_render_batch(db, current_user.id)
+    logger.info(f"Admin {current_user.id} started render batch {batch.id} ({batch.total} resumes)")
+    await job_queue.submit(background_tasks, "rerender", batch_id=batch.id)
+    return batch_progress(batch)
+
+@router.post("/rerender/{batch_id}/resume")
+async def resume_rerender(
+    batch_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_superuser),
+    db: Session = Depends(get_db)
+):
+    """Continue an interrupted or failed batch from its last committed chunk."""
+    batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Render batch not found")
+    if batch.status == RenderBatchStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Render batch already completed")
+    if lease_is_live(batch):
+        raise HTTPException(status_code=409, detail="Render batch is still running")
+    
+    await job_queue.submit(background_tasks, "rerender", batch_id=batch.id)
+    return batch_progress(batch)
+
+@router.get("/rerender")
+def list_rerenders(
+    limit: int = 10,
+    current_user: User = Depends(require_superuser),
+    db: Session = Depends(get_db)
+):
+    """Most recent render batches with progress and throughput."""
+    batches = db.query(RenderBatch).order_by(RenderBatch.id.desc()).limit(limit).all()
+    return {"batches": [batch_progress(b) for b in batches]}
+
+@router.get("/rerender/{batch_id}")
+def get_rerender(
+    batch_id: int,
+    current_user: User = Depends(require_superuser),
+    db: Session = Depends(get_db)
+):
+    batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Render batch not found")
+    return batch_progress(batch)
+
@@ -1,57 +1,91 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, session_scope
 from app.models import Resume, ResumeStatus, User, CreditTransaction
 from app.core import security
-from app.utils.text_extractor import extract_text
+from app.core.queue import job_queue
+from app.core.events import event_bus
+from app.services.resume_text import get_resume_text, has_sufficient_text, INSUFFICIENT_TEXT_ERROR
 from app.services.analyzer import analyze_resume_text
+from app.services.llm_scheduler import llm_scheduler, priority_for_user
 from app.api.v1.endpoints.upload import get_current_user
 import json
 import traceback
 
 router = APIRouter()
 
-async def process_analysis(resume_id: int, db: Session, api_keys: dict = None, provider: str = None, model: str = None):
+async def process_analysis(
+    resume_id: int,
+    api_keys: dict = None,
+    provider: str = None,
+    model: str = None,
+    user_id: int = None,
+    priority: str = None
+):
     """Background task to process resume analysis."""
-    resume = db.query(Resume).filter(Resume.id == resume_id).first()
-    if not resume:
-        return
-        
-    resume.status = ResumeStatus.ANALYZING
-    db.commit()
+    with session_scope() as db:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume:
+            return
+        user_id = user_id or resume.user_id
+        resume.status = ResumeStatus.ANALYZING
+    
+    async def publish_field(name, value):
+        await event_bus.publish(resume_id, "field", {"name": name, "value": value})
     
     try:
-        # Extract Text from uploaded file
-        text = await extract_text(resume.s3_key_original)
+        # Extracted text (stored once per upload)
+        await event_bus.publish(resume_id, "stage", {"stage": "extracting"})
+        text = await get_resume_text(resume_id)
         
-        if not text or len(text.strip()) < 50:
-            raise ValueError("Could not extract sufficient text from the resume. Please upload a valid PDF or DOCX file.")
+        if not has_sufficient_text(text):
+            raise ValueError(INSUFFICIENT_TEXT_ERROR)
         
-        # Analyze with LLM
-        analysis_result = await analyze_resume_text(
-            text, 
-            api_keys,
-            provider=provider,
-            model=model
-        )
+        # Analyze with LLM (no DB connection is held meanwhile); fields are
+        # pushed to subscribers as the response streams in
+        await event_bus.publish(resume_id, "stage", {"stage": "analyzing"})
+        with llm_scheduler.tenant(user_id, priority):
+            analysis_result = await analyze_resume_text(
+                text, 
+                api_keys,
+                provider=provider,
+                model=model,
+                on_field=publish_field
+            )
         
         # Save Result
-        resume.analysis_result = analysis_result
-        resume.status = ResumeStatus.WAITING_INPUT
-        
-        db.commit()
+        await _save_analysis(resume_id, analysis_result, ResumeStatus.WAITING_INPUT)
     except ValueError as e:
         # User-friendly errors
         print(f"Analysis Failed (ValueError): {e}")
-        resume.analysis_result = {"error": str(e)}
-        resume.status = ResumeStatus.FAILED
-        db.commit()
+        await _save_analysis(resume_id, {"error": str(e)}, ResumeStatus.FAILED)
     except Exception as e:
         print(f"Analysis Failed: {e}")
         traceback.print_exc()
-        resume.analysis_result = {"error": f"Analysis failed: {str(e)}"}
-        resume.status = ResumeStatus.FAILED
-        db.commit()
+        await _save_analysis(resume_id, {"error": f"Analysis failed: {str(e)}"}, ResumeStatus.FAILED)
+
+async def _save_analysis(resume_id: int, analysis_result: dict, status: ResumeStatus, only_from: tuple = None):
+    with session_scope() as db:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume or (only_from and resume.status not in only_from):
+            return
+        resume.analysis_result = analysis_result
+        resume.status = status
+    await event_bus.publish(resume_id, "status", {
+        "status": status.value,
+        "error": analysis_result.get("error")
+    })
+
+async def fail_dead_analysis(resume_id: int, **_):
+    """Dead-letter handler: the job crashed its worker on every attempt."""
+    await _save_analysis(
+        resume_id,
+        {"error": "Analysis failed repeatedly. Please try again later."},
+        ResumeStatus.FAILED,
+        only_from=(ResumeStatus.UPLOADED, ResumeStatus.ANALYZING)
+    )
+
+job_queue.register("analysis", process_analysis, secret_fields=("api_keys",), on_dead=fail_dead_analysis)
 
 @router.post("/{resume_id}/analyze")
 async def start_analysis(
@@ -68,6 +102,10 @@ async def start_analysis(
     resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
+    
+    # Reject uploads already known to be unreadable before charging a credit
+    if resume.extracted_text and not has_sufficient_text(resume.extracted_text.text):
+        raise HTTPException(status_code=422, detail=INSUFFICIENT_TEXT_ERROR)
         
     # Deduct Credit
     current_user.credits -= 1
@@ -88,7 +126,16 @@ async def start_analysis(
     provider = request.headers.get("x-llm-provider")
     model = request.headers.get("x-llm-model")
 
-    background_tasks.add_task(process_analysis, resume.id, db, api_keys, provider, model)
+    await job_queue.submit(
+        background_tasks,
+        "analysis",
+        resume_id=resume.id,
+        api_keys=api_keys,
+        provider=provider,
+        model=model,
+        user_id=current_user.id,
+        priority=priority_for_user(db, current_user.id)
+    )
     
     return {"message": "Analysis started", "status": "analyzing"}
 
@@ -5,12 +5,13 @@ from app.db.session import get_db
 from app.models import Resume, User
 from app.api.v1.endpoints.upload import get_current_user
 from app.core.storage import storage
+from app.services.documents import FORMATS, is_failed_render, render_document
 import os
 
 router = APIRouter()
 
 @router.get("/{resume_id}/download")
-def download_resume(
+async def download_resume(
     resume_id: int,
     format: str = "pdf",
     current_user: User = Depends(get_current_user),
@@ -20,16 +21,32 @@ def download_resume(
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
-    if format == "pdf":
-        file_key = resume.s3_key_generated_pdf
-        content_type = "application/pdf"
-        extension = "pdf"
-    elif format == "docx":
-        file_key = resume.s3_key_generated_docx
-        content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        extension = "docx"
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported format. Use 'pdf' or 'docx'.")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use {' or '.join(repr(f) for f in FORMATS)}.")
+    content_type = FORMATS[format][0]
+    extension = format
+    key_column = f"s3_key_generated_{format}"
+    file_key = getattr(resume, key_column, None)
+    if is_failed_render(file_key) and (resume.analysis_result or {}).get("rewritten_content"):
+        # Left by an earlier failed render: render again
+        file_key = None
+    
+    # Formats other than the PDF are rendered on first download, then reused
+    analysis = resume.analysis_result or {}
+    if not file_key and analysis.get("rewritten_content"):
+        try:
+            # Raise instead of storing an error document: saving its key would
+            # serve the error stub for this resume forever
+            file_key = await render_document(
+                analysis["rewritten_content"],
+                format,
+                analysis.get("rewrite_template") or "professional",
+                store_errors=False
+            )
+        except Exception:
+            raise HTTPException(status_code=500, detail=f"Could not render the {format.upper()}, please try again")
+        setattr(resume, key_column, file_key)
+        db.commit()
     
     if not file_key:
         raise HTTPException(status_code=404, detail=f"{format.upper()} not generated yet")
@@ -67,9 +84,17 @@ def delete_resume(
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
+    # Generated documents are content-addressed and can be shared with other
+    # resumes; keep any file another resume still references
+    file_keys = [resume.s3_key_original]
+    for column in (Resume.s3_key_generated_pdf, Resume.s3_key_generated_docx):
+        file_key = getattr(resume, column.key)
+        if file_key and not db.query(Resume.id).filter(column == file_key, Resume.id != resume.id).first():
+            file_keys.append(file_key)
+    
     # Delete files from storage (local only for now)
     if storage.local_storage_path:
-        for file_key in [resume.s3_key_original, resume.s3_key_generated_pdf, resume.s3_key_generated_docx]:
+        for file_key in file_keys:
             if file_key and not file_key.startswith("s3://"):
                 full_path = os.path.join(storage.local_storage_path, file_key) if not os.path.isabs(file_key) else file_key
                 if os.path.exists(full_path):
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from app.db.session import session_scope
+from app.models import Resume, ResumeStatus
+from app.core.events import event_bus
+from app.api.v1.endpoints.upload import get_current_user
+from typing import Optional
+import asyncio
+import json
+import os
+
+router = APIRouter()
+
+# EventSource cannot send headers, so the token may also come as ?token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+KEEPALIVE_SECONDS = 15
+# Streams are closed after this long; EventSource reconnects on its own
+MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "600"))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _snapshot(resume: Resume) -> dict:
+    return {
+        "status": resume.status.value if resume.status else "unknown",
+        "analysis_result": resume.analysis_result,
+        "has_error": resume.analysis_result.get("error") if resume.analysis_result else None
+    }
+
+@router.get("/{resume_id}/events")
+async def stream_events(
+    resume_id: int,
+    request: Request,
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None)
+):
+    """
+    Server-sent events for one resume, replacing polling of /analysis:
+    `snapshot` (current status and results, sent first), `stage`
+    (extracting, analyzing, generating, rendering), `field` (analysis fields
+    as the LLM streams them; a later field of the same name replaces an
+    earlier one, as when a hedged request wins) and `status` (completed /
+    waiting_input / failed).
+    """
+    # Not Depends(get_db): the stream outlives the request handler and must
+    # not hold a database connection while it waits
+    with session_scope() as db:
+        user = get_current_user(header_token or token or "", db)
+        resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == user.id).first()
+        if not resume:
+            raise HTTPException(status_code=404, detail="Resume not found")
+
+    async def events():
+        async with event_bus.subscribe(resume_id) as subscription:
+            # Subscribed before reading the snapshot, so nothing is missed
+            with session_scope() as db:
+                resume = db.query(Resume).filter(Resume.id == resume_id).first()
+                yield _sse("snapshot", _snapshot(resume))
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + MAX_STREAM_SECONDS
+            while loop.time() < deadline:
+                if await request.is_disconnected():
+                    return
+                message = await subscription.next(timeout=KEEPALIVE_SECONDS)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(*message)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
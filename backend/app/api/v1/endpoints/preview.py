@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.models import Resume, User
+from app.services.pdf_generator import pdf_generator, GENERATOR_VERSION
+from app.api.v1.endpoints.upload import get_current_user
+from typing import Optional
+import hashlib
+
+router = APIRouter()
+
+def preview_etag(content: dict, theme: str) -> str:
+    """Changes whenever the rewritten content, the theme or the templates change."""
+    digest = hashlib.sha256(
+        f"{GENERATOR_VERSION}|{theme}|{pdf_generator.content_hash(content)}".encode("utf-8")
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+@router.get("/{resume_id}/preview", response_class=HTMLResponse)
+def preview_resume(
+    resume_id: int,
+    request: Request,
+    theme: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Render the rewritten resume as HTML for a live preview, without building a PDF."""
+    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    analysis = resume.analysis_result or {}
+    content = analysis.get("rewritten_content")
+    if not content:
+        raise HTTPException(status_code=409, detail="Resume has not been rewritten yet")
+
+    theme = theme or analysis.get("rewrite_template") or "modern"
+    if theme not in pdf_generator.get_available_templates():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown template. Use one of: {', '.join(pdf_generator.get_available_templates())}."
+        )
+
+    # Previews are per user; the browser may keep them but must revalidate
+    etag = preview_etag(content, theme)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return HTMLResponse(pdf_generator.render_html(content, theme), headers=headers)
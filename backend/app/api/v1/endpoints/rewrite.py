@@ -1,100 +1,146 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Body, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, session_scope
 from app.models import Resume, ResumeStatus, User
-from app.services.rewriter import rewrite_resume
-from app.utils.text_extractor import extract_text
+from app.core.queue import job_queue
+from app.core.events import event_bus
+from app.services.rewriter import rewrite_resume, rewrite_resume_incremental
+from app.services.resume_text import get_resume_text
+from app.services.documents import render_documents
+from app.services.llm_scheduler import llm_scheduler, priority_for_user
 from app.api.v1.endpoints.upload import get_current_user
 from typing import Dict, Optional
-import os
 import traceback
+import os
 
 router = APIRouter()
 
+# Re-rewrite only the sections affected by changed answers
+INCREMENTAL_REWRITE = os.getenv("REWRITE_INCREMENTAL", "true").lower() == "true"
+
+VALID_TEMPLATES = ["professional", "modern", "classic", "minimal"]
+
 async def process_rewrite(
     resume_id: int, 
     answers: Dict[str, str], 
     template: str, 
-    db: Session, 
     api_keys: dict = None,
     provider: str = None,
-    model: str = None
+    model: str = None,
+    user_id: int = None,
+    priority: str = None
 ):
     """Background task to rewrite resume and generate PDF/DOCX."""
-    resume = db.query(Resume).filter(Resume.id == resume_id).first()
-    if not resume:
-        return
-    
-    resume.status = ResumeStatus.GENERATING
-    db.commit()
+    with session_scope() as db:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume:
+            return
+        user_id = user_id or resume.user_id
+        analysis = resume.analysis_result or {}
+        resume.status = ResumeStatus.GENERATING
     
     try:
-        # Extract Text
-        text = await extract_text(resume.s3_key_original)
+        # Extracted text (stored once per upload)
+        await event_bus.publish(resume_id, "stage", {"stage": "extracting"})
+        text = await get_resume_text(resume_id)
         
-        # Rewrite with LLM
-        analysis = resume.analysis_result or {}
-        
-        rewritten_content = await rewrite_resume(
-            text, 
-            analysis, 
-            answers, 
-            api_keys,
-            provider=provider,
-            model=model
-        )
+        await event_bus.publish(resume_id, "stage", {"stage": "generating"})
+        # Rewrite with LLM (no DB connection is held meanwhile). With a
+        # previous rewrite, only the sections touched by changed answers
+        with llm_scheduler.tenant(user_id, priority):
+            if INCREMENTAL_REWRITE and analysis.get("rewritten_content") and analysis.get("rewrite_answers") is not None:
+                rewritten_content = await rewrite_resume_incremental(
+                    text,
+                    analysis,
+                    analysis["rewritten_content"],
+                    analysis["rewrite_answers"],
+                    answers,
+                    api_keys,
+                    provider=provider,
+                    model=model
+                )
+            else:
+                rewritten_content = await rewrite_resume(
+                    text, 
+                    analysis, 
+                    answers, 
+                    api_keys,
+                    provider=provider,
+                    model=model
+                )
         
-        # Store rewritten content in analysis_result for reference
-        resume.analysis_result = {
+        # Store rewritten content (and what produced it) in analysis_result
+        # so template switches can re-render without the LLM
+        analysis = {
             **analysis,
-            "rewritten_content": rewritten_content
+            "rewritten_content": rewritten_content,
+            "rewrite_answers": answers,
+            "rewrite_template": template
         }
         
-        # GENERATE PDF and DOCX
-        from app.services.pdf_generator import pdf_generator
-        from app.core.storage import storage
-        
-        pdf_bytes = pdf_generator.generate(rewritten_content, theme=template)
-        docx_bytes = pdf_generator.generate_docx(rewritten_content)
-        
-        # SAVE FILES
-        pdf_filename = f"{resume.user_id}/generated_{resume.id}.pdf"
-        docx_filename = f"{resume.user_id}/generated_{resume.id}.docx"
-        
-        # Save to local storage
-        if storage.local_storage_path:
-            # PDF
-            pdf_path = os.path.join(storage.local_storage_path, pdf_filename)
-            os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_bytes)
-            
-            # DOCX
-            docx_path = os.path.join(storage.local_storage_path, docx_filename)
-            with open(docx_path, "wb") as f:
-                f.write(docx_bytes)
+        # GENERATE and SAVE PDF (DOCX is rendered on first download)
+        await event_bus.publish(resume_id, "stage", {"stage": "rendering"})
+        keys = await render_documents(rewritten_content, template)
         
         # UPDATE DB
-        resume.s3_key_generated_pdf = pdf_filename
-        resume.s3_key_generated_docx = docx_filename
-        resume.status = ResumeStatus.COMPLETED
-        db.commit()
+        with session_scope() as db:
+            resume = db.query(Resume).filter(Resume.id == resume_id).first()
+            if resume:
+                resume.analysis_result = analysis
+                resume.s3_key_generated_pdf = keys["pdf"]
+                resume.s3_key_generated_docx = None
+                resume.status = ResumeStatus.COMPLETED
+        await event_bus.publish(resume_id, "status", {"status": ResumeStatus.COMPLETED.value, "template": template})
         
     except Exception as e:
         print(f"Rewrite Failed: {e}")
         traceback.print_exc()
-        resume.analysis_result = {
-            **(resume.analysis_result or {}),
-            "rewrite_error": str(e)
-        }
+        with session_scope() as db:
+            resume = db.query(Resume).filter(Resume.id == resume_id).first()
+            if resume:
+                resume.analysis_result = {
+                    **analysis,
+                    "rewrite_error": str(e)
+                }
+                resume.status = ResumeStatus.FAILED
+        await event_bus.publish(resume_id, "status", {"status": ResumeStatus.FAILED.value, "error": str(e)})
+
+async def fail_dead_rewrite(resume_id: int, **_):
+    """Dead-letter handler: the job crashed its worker on every attempt."""
+    error = "Rewrite failed repeatedly. Please try again later."
+    with session_scope() as db:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume or resume.status != ResumeStatus.GENERATING:
+            return
+        resume.analysis_result = {**(resume.analysis_result or {}), "rewrite_error": error}
         resume.status = ResumeStatus.FAILED
-        db.commit()
+    await event_bus.publish(resume_id, "status", {"status": ResumeStatus.FAILED.value, "error": error})
+
+job_queue.register("rewrite", process_rewrite, secret_fields=("api_keys",), on_dead=fail_dead_rewrite)
+
+async def rerender_resume(resume: Resume, template: str, db: Session):
+    """Regenerate documents from the stored rewritten content for a new template."""
+    analysis = resume.analysis_result or {}
+    keys = await render_documents(analysis["rewritten_content"], template)
+    
+    resume.analysis_result = {
+        **analysis,
+        "rewrite_template": template
+    }
+    # The DOCX layout does not depend on the template, so its key stays valid
+    resume.s3_key_generated_pdf = keys["pdf"]
+    resume.status = ResumeStatus.COMPLETED
+    db.commit()
+    await event_bus.publish(resume.id, "status", {"status": ResumeStatus.COMPLETED.value, "template": template})
 
 class RewriteRequest(BaseModel):
     answers: Dict[str, str]
     template: Optional[str] = "professional"
 
+class RenderRequest(BaseModel):
+    template: str
+
 @router.post("/{resume_id}/rewrite")
 async def start_rewrite(
     resume_id: int, 
@@ -109,14 +155,24 @@ async def start_rewrite(
     template = request_body.template or "modern"
     
     # Validate template
-    valid_templates = ["professional", "modern", "classic", "minimal"]
-    if template not in valid_templates:
+    if template not in VALID_TEMPLATES:
         template = "professional"
     
     resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
+    # Same answers as the stored rewrite: only the template changed, so
+    # re-render the existing content instead of calling the LLM again
+    analysis = resume.analysis_result or {}
+    if (
+        resume.status == ResumeStatus.COMPLETED
+        and analysis.get("rewritten_content")
+        and analysis.get("rewrite_answers") == answers
+    ):
+        await rerender_resume(resume, template, db)
+        return {"message": "Resume re-rendered", "status": "completed", "template": template}
+    
     # Extract all config from headers
     api_keys = {
         "openai": request.headers.get("x-openai-key"),
@@ -126,15 +182,39 @@ async def start_rewrite(
     provider = request.headers.get("x-llm-provider")
     model = request.headers.get("x-llm-model")
     
-    background_tasks.add_task(
-        process_rewrite, 
-        resume.id, 
-        answers, 
-        template, 
-        db, 
-        api_keys,
-        provider,
-        model
+    await job_queue.submit(
+        background_tasks,
+        "rewrite",
+        resume_id=resume.id,
+        answers=answers,
+        template=template,
+        api_keys=api_keys,
+        provider=provider,
+        model=model,
+        user_id=current_user.id,
+        priority=priority_for_user(db, current_user.id)
     )
     
     return {"message": "Rewrite started", "status": "generating", "template": template}
+
+@router.post("/{resume_id}/render")
+async def render_template(
+    resume_id: int,
+    request_body: RenderRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Switch the template of a completed resume without re-running the rewrite."""
+    if request_body.template not in VALID_TEMPLATES:
+        raise HTTPException(status_code=400, detail=f"Unknown template. Use one of: {', '.join(VALID_TEMPLATES)}.")
+    
+    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    
+    analysis = resume.analysis_result or {}
+    if resume.status != ResumeStatus.COMPLETED or not analysis.get("rewritten_content"):
+        raise HTTPException(status_code=409, detail="Resume has not been rewritten yet")
+    
+    await rerender_resume(resume, request_body.template, db)
+    return {"message": "Resume re-rendered", "status": "completed", "template": request_body.template}
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from app.core.storage import storage
+from app.core.queue import job_queue
+from app.services.resume_text import preprocess_resume
 from app.db.session import get_db
 from app.models import User, Resume, ResumeStatus
 from app.core import security
@@ -12,6 +14,11 @@ import os
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Extract and validate text right after upload instead of on the first /analyze
+EAGER_EXTRACTION = os.getenv("EAGER_EXTRACTION", "true").lower() == "true"
+
+job_queue.register("extraction", preprocess_resume)
+
 def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
     # Simple JWT decode for now, verify in DB
     try:
@@ -29,6 +36,7 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session
 
 @router.post("/upload")
 async def upload_resume(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -54,6 +62,8 @@ async def upload_resume(
     db.commit()
     db.refresh(resume)
     
+    if EAGER_EXTRACTION:
+        await job_queue.submit(background_tasks, "extraction", resume_id=resume.id)
     
     # Trigger Analysis (Async background task would be better here)
     # For MVP, we can just return and let client poll or trigger manually.
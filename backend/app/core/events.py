@@ -0,0 +1,97 @@
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Events of one resume, in publish order; see EventBus.subscribe()."""
+
+    def __init__(self, queue: Optional[asyncio.Queue] = None, pubsub=None):
+        self._queue = queue
+        self._pubsub = pubsub
+
+    async def next(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """The next (event, data), or None if nothing arrives within `timeout`."""
+        if self._pubsub is not None:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                if message and message.get("type") == "message":
+                    payload = json.loads(message["data"])
+                    return payload["event"], payload["data"]
+        try:
+            payload = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return payload["event"], payload["data"]
+
+
+class EventBus:
+    """
+    Progress events per resume (pipeline stages, analysis fields as they
+    stream in), pushed to clients over server-sent events.
+
+    With REDIS_URL, events go through Redis pub/sub so a job running in a
+    worker process reaches the API process holding the client connection.
+    Without it, jobs run in the web process and events are delivered through
+    in-memory queues. Events are not stored: a client that connects late gets
+    the current state from the database, then live events.
+    """
+
+    def __init__(self):
+        self._local: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    @staticmethod
+    def _channel(resume_id: int) -> str:
+        return f"events:resume:{resume_id}"
+
+    async def publish(self, resume_id: int, event: str, data: Dict[str, Any]):
+        """Best effort: a failure to publish never fails the job that reports progress."""
+        channel = self._channel(resume_id)
+        payload = {"event": event, "data": data}
+        try:
+            redis = get_redis()
+            if redis is not None:
+                await redis.publish(channel, json.dumps(payload, default=str))
+                return
+            for queue in self._local.get(channel, ()):
+                queue.put_nowait(payload)
+        except Exception as e:
+            logger.warning(f"Publishing {event} for resume {resume_id} failed: {e}")
+
+    @asynccontextmanager
+    async def subscribe(self, resume_id: int) -> AsyncIterator[Subscription]:
+        channel = self._channel(resume_id)
+        redis = get_redis()
+        if redis is not None:
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(channel)
+            try:
+                yield Subscription(pubsub=pubsub)
+            finally:
+                await pubsub.unsubscribe(channel)
+                await pubsub.aclose()
+            return
+
+        queue = asyncio.Queue()
+        self._local[channel].add(queue)
+        try:
+            yield Subscription(queue=queue)
+        finally:
+            self._local[channel].discard(queue)
+            if not self._local[channel]:
+                del self._local[channel]
+
+
+event_bus = EventBus()
@@ -0,0 +1,259 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Write end of the pool's start-report pipe, set in each worker by _init_worker
+_started_conn = None
+
+
+def _init_worker(started_conn):
+    global _started_conn
+    _started_conn = started_conn
+
+
+def _run_task(task_id: int, fn: Callable, args: tuple) -> Any:
+    """Worker-side wrapper: reports which process picked the task up before running it."""
+    # A pipe rather than a multiprocessing queue: messages this small are
+    # written atomically without a lock, so a worker killed at any point can
+    # never leave a lock held that would block the others
+    _started_conn.send((task_id, os.getpid()))
+    return fn(*args)
+
+
+class WorkerLost(RuntimeError):
+    """The worker running a task was killed (another task on it hung); the task may be resubmitted."""
+
+
+class PoolTask:
+    """
+    Handle on one task submitted to a ProcessPool.
+
+    Timeouts passed to `result()` / `ProcessPool.run()` count from the moment a
+    worker starts the task, not from submission, so time spent queued behind
+    other tasks never makes a healthy task time out.
+    """
+
+    def __init__(self, pool: "ProcessPool", task_id: int, name: str):
+        self.pool = pool
+        self.task_id = task_id
+        self.name = name
+        self.pid: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.done = False
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []
+
+    def _set_started(self, pid: int):
+        with self._condition:
+            if self.done or self.started_at is not None:
+                return
+            self.pid = pid
+            self.started_at = time.monotonic()
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def _set_result(self, value: Any = None, error: Optional[BaseException] = None):
+        with self._condition:
+            if self.done:
+                return
+            self.done = True
+            self.value = value
+            self.error = error
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def add_listener(self, listener: Callable[[], None]):
+        """Call `listener` (from any thread) when the task starts or finishes, and once now."""
+        with self._condition:
+            self._listeners.append(listener)
+        listener()
+
+    def remaining(self, timeout: Optional[float]) -> Optional[float]:
+        if timeout is None or self.started_at is None:
+            return timeout
+        return self.started_at + timeout - time.monotonic()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the task finishes. If it runs longer than `timeout`
+        seconds, its worker is killed and multiprocessing.TimeoutError raised.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.done or self.started_at is not None)
+            if not self.done:
+                self._condition.wait_for(lambda: self.done, self.remaining(timeout))
+            timed_out = not self.done
+        if timed_out:
+            self.pool.kill(self)
+            raise multiprocessing.TimeoutError(f"{self.name} ran longer than {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ProcessPool:
+    """
+    Lazily started pool of worker processes for CPU-bound work (PDF parsing,
+    document rendering) that must not run on the event loop.
+
+    Built on multiprocessing.Pool rather than ProcessPoolExecutor because a
+    task that exceeds its timeout has to be killed, not just abandoned. Each
+    worker reports the task it starts, so a hung task is stopped by killing
+    only the worker running it: the pool replaces that worker and every other
+    task carries on. Workers are also replaced after `max_tasks_per_child`
+    tasks to cap memory growth.
+    """
+
+    def __init__(self, name: str, size: int, max_tasks_per_child: Optional[int] = None):
+        self.name = name
+        self.size = size
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._tasks: Dict[int, PoolTask] = {}
+        # pid -> task it is running
+        self._running: Dict[int, PoolTask] = {}
+        self._killed_pids = deque(maxlen=64)
+
+    def submit(self, fn: Callable, *args: Any) -> PoolTask:
+        """Schedule `fn(*args)` in a worker; wait with `.result(timeout)`."""
+        pool = self._get_pool()
+        task = PoolTask(self, next(self._ids), getattr(fn, "__name__", str(fn)))
+        with self._lock:
+            self._tasks[task.task_id] = task
+
+        def on_result(value):
+            self._finish(task, value)
+
+        def on_error(error):
+            self._finish(task, None, error)
+
+        pool.apply_async(_run_task, (task.task_id, fn, args), callback=on_result, error_callback=on_error)
+        return task
+
+    async def run(self, fn: Callable, *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run `fn(*args)` in a worker and await its result; on timeout only its worker is killed."""
+        task = self.submit(fn, *args)
+        loop = asyncio.get_running_loop()
+        started = loop.create_future()
+        finished = loop.create_future()
+
+        def update():
+            if task.started_at is not None and not started.done():
+                started.set_result(None)
+            if task.done and not finished.done():
+                finished.set_result(None)
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(update)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+        task.add_listener(notify)
+        await asyncio.wait([started, finished], return_when=asyncio.FIRST_COMPLETED)
+        if not finished.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(finished), task.remaining(timeout))
+            except asyncio.TimeoutError:
+                logger.error(f"{self.name} task {task.name} timed out after {timeout}s, killing worker {task.pid}")
+                self.kill(task)
+                raise
+        if task.error is not None:
+            raise task.error
+        return task.value
+
+    def kill(self, task: PoolTask):
+        """Stop a hung task by killing the worker running it; the pool starts a replacement."""
+        with self._lock:
+            pid = task.pid
+            if task.done or pid is None or self._running.get(pid) is not task:
+                return
+            del self._running[pid]
+            self._killed_pids.append(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self._finish(task, None, TimeoutError(f"{self.name} task {task.name} timed out"))
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            tasks, self._tasks = self._tasks, {}
+            self._running = {}
+        if pool is not None:
+            if self._killed_pids:
+                # multiprocessing.Pool.join() waits for the results of tasks
+                # whose worker was killed, which never come
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+        for task in tasks.values():
+            task._set_result(None, RuntimeError(f"{self.name} pool was shut down"))
+
+    def _finish(self, task: PoolTask, value: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._tasks.pop(task.task_id, None)
+            if task.pid is not None and self._running.get(task.pid) is task:
+                del self._running[task.pid]
+        task._set_result(value, error)
+
+    def _on_started(self, task_id: int, pid: int):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            # Started by a worker we already killed (it picked the task up
+            # just before dying): fail it now so the caller can resubmit
+            lost = pid in self._killed_pids
+            if not lost:
+                self._running[pid] = task
+        if lost:
+            self._finish(task, None, WorkerLost(f"{self.name} worker {pid} was killed"))
+        else:
+            task._set_started(pid)
+
+    def _watch_starts(self, started_conn):
+        while True:
+            try:
+                message = started_conn.recv()
+            except (EOFError, OSError):
+                return
+            self._on_started(*message)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: never fork a process that has threads and open sockets
+                context = multiprocessing.get_context("spawn")
+                self._killed_pids.clear()
+                reader, writer = context.Pipe(duplex=False)
+                self._pool = context.Pool(
+                    self.size,
+                    initializer=_init_worker,
+                    initargs=(writer,),
+                    maxtasksperchild=self.max_tasks_per_child,
+                )
+                threading.Thread(
+                    target=self._watch_starts, args=(reader,), name=f"{self.name}-pool-starts", daemon=True
+                ).start()
+            return self._pool
@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import uuid
+import base64
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import BackgroundTasks
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+# Users whose turn is checked per priority on each claim (oldest turn first)
+TENANT_SCAN = 100
+
+# Jobs without a user_id (upload extraction, re-renders) share one sub-queue
+SYSTEM_TENANT = "-"
+
+
+class JobQueue:
+    """
+    Durable job queue on top of Redis, consumed by `python -m app.worker`.
+
+    Jobs are queued per user: each (queue, user) is a sorted set of job ids
+    scored by the time they become visible. Claiming a job pushes its score
+    `visibility_timeout` seconds into the future, so if a worker dies mid-job
+    the job reappears for another worker once the timeout lapses; workers
+    extend the lease while a job runs. Payloads live in a hash next to the
+    queue and are deleted on ack. Jobs that keep failing are moved to a
+    dead-letter list (capped at `dead_letter_max` entries) after
+    `max_attempts`, and the queue's `on_dead` handler is called with the
+    payload so the job's resume does not stay in progress forever.
+
+    Claims are fair across users rather than FIFO: users with queued jobs
+    take turns (round-robin, in a sorted set scored by when each was last
+    served), so one user's 50 queued resumes take one worker slot at a time
+    alongside everyone else's. The payload's `user_id` and `priority` pick
+    the sub-queue; `priorities` are served in order, except that every
+    `priority_share + 1`-th claim serves the lower ones first so they never
+    starve.
+
+    Payload fields registered as secret (users' own API keys) never go into
+    the payload hash: they are encrypted into a separate key that expires
+    after `secret_ttl` seconds and is deleted on ack and before dead-lettering.
+
+    Without REDIS_URL the queue is disabled and `submit` runs the handler as a
+    FastAPI background task in the web process, as before.
+    """
+
+    def __init__(
+        self,
+        visibility_timeout: int = 600,
+        max_attempts: int = 3,
+        secret_ttl: int = 3600,
+        dead_letter_max: int = 1000,
+        priorities: Tuple[str, ...] = ("paid", "standard"),
+        priority_share: int = 3
+    ):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.secret_ttl = secret_ttl
+        self.dead_letter_max = dead_letter_max
+        self.priorities = priorities
+        self.priority_share = priority_share
+        self.handlers: Dict[str, Callable] = {}
+        self.secret_fields: Dict[str, Tuple[str, ...]] = {}
+        self.dead_handlers: Dict[str, Callable] = {}
+        self._fernet = None
+
+    @property
+    def enabled(self) -> bool:
+        return get_redis() is not None
+
+    def register(
+        self,
+        name: str,
+        handler: Callable,
+        secret_fields: Tuple[str, ...] = (),
+        on_dead: Optional[Callable] = None
+    ):
+        """
+        Register the coroutine function that processes jobs of a queue.
+        `secret_fields` name payload arguments that are stored encrypted.
+        `on_dead` is a coroutine function called with the payload (without
+        secrets) of a job given up on after `max_attempts`.
+        """
+        self.handlers[name] = handler
+        self.secret_fields[name] = tuple(secret_fields)
+        if on_dead is not None:
+            self.dead_handlers[name] = on_dead
+
+    async def submit(self, background_tasks: BackgroundTasks, name: str, **payload: Any) -> Optional[str]:
+        """Enqueue a job, or schedule it in-process when no Redis is configured."""
+        if self.enabled:
+            return await self.enqueue(name, payload)
+        background_tasks.add_task(self.handlers[name], **payload)
+        return None
+
+    async def enqueue(self, name: str, payload: Dict[str, Any]) -> str:
+        redis = get_redis()
+        job_id = uuid.uuid4().hex
+        secret_fields = self.secret_fields.get(name, ())
+        secrets = {field: payload[field] for field in secret_fields if payload.get(field) is not None}
+        payload = {field: value for field, value in payload.items() if field not in secret_fields}
+        priority, tenant = self._tenant(payload)
+        now = time.time()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(name, "data"), job_id, json.dumps(payload))
+            if secrets:
+                token = self._cipher().encrypt(json.dumps(secrets).encode("utf-8")).decode("ascii")
+                pipe.set(self._secret_key(name, job_id), token, ex=self.secret_ttl)
+            pipe.hset(self._key(name, "tenant"), job_id, tenant)
+            pipe.zadd(self._queue_key(name, tenant), {job_id: now})
+            # A user new to the rotation waits behind those already in it
+            pipe.zadd(self._key(name, f"turns:{priority}"), {tenant: now}, nx=True)
+            await pipe.execute()
+        return job_id
+
+    async def claim(self, names: Iterable[str]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Lease a visible job from the given queues, taking users in turn; None if there is none."""
+        redis = get_redis()
+        for name in names:
+            priorities = list(self.priorities)
+            # Only successful claims count, so idle polls do not shift the share
+            claims = int(await redis.get(self._key(name, "claims")) or 0)
+            if (claims + 1) % (self.priority_share + 1) == 0:
+                priorities.reverse()
+            for priority in priorities:
+                turns_key = self._key(name, f"turns:{priority}")
+                for tenant in await redis.zrange(turns_key, 0, TENANT_SCAN - 1):
+                    job = await self._claim_from(name, turns_key, tenant)
+                    if job is not None:
+                        await redis.incr(self._key(name, "claims"))
+                        return job
+        return None
+
+    async def _claim_from(self, name: str, turns_key: str, tenant: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Lease the oldest visible job of one user, moving them to the back of the rotation."""
+        from redis.exceptions import WatchError
+
+        redis = get_redis()
+        queue_key = self._queue_key(name, tenant)
+        while True:
+            async with redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(queue_key)
+                    now = time.time()
+                    job_ids = await pipe.zrangebyscore(queue_key, "-inf", now, start=0, num=1)
+                    if not job_ids:
+                        if await pipe.zcard(queue_key) == 0:
+                            # Nothing queued or running: leave the rotation
+                            # (aborted if a job is enqueued meanwhile)
+                            pipe.multi()
+                            pipe.zrem(turns_key, tenant)
+                            await pipe.execute()
+                        else:
+                            await pipe.unwatch()
+                        return None
+                    job_id = job_ids[0]
+                    pipe.multi()
+                    pipe.zadd(queue_key, {job_id: now + self.visibility_timeout})
+                    pipe.zadd(turns_key, {tenant: now}, xx=True)
+                    pipe.hincrby(self._key(name, "attempts"), job_id, 1)
+                    pipe.hget(self._key(name, "data"), job_id)
+                    _, _, attempts, raw_payload = await pipe.execute()
+                except WatchError:
+                    # Another worker claimed from this user first; try the next user
+                    return None
+
+            if raw_payload is None:
+                # Payload already acked by a worker whose lease had expired
+                await self._forget(name, job_id, tenant)
+                continue
+            if attempts > self.max_attempts:
+                logger.error(f"Job {name}:{job_id} exceeded {self.max_attempts} attempts, moving to dead letter")
+                # raw_payload holds no secrets; _forget drops the encrypted ones
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.rpush(self._key(name, "dead"), raw_payload)
+                    pipe.ltrim(self._key(name, "dead"), -self.dead_letter_max, -1)
+                    await pipe.execute()
+                await self._forget(name, job_id, tenant)
+                await self._dead(name, job_id, json.loads(raw_payload))
+                continue
+            payload = json.loads(raw_payload)
+            payload.update(await self._load_secrets(name, job_id))
+            return job_id, name, payload
+
+    async def extend(self, name: str, job_id: str):
+        """Renew the lease on a running job."""
+        tenant = await get_redis().hget(self._key(name, "tenant"), job_id)
+        if tenant is not None:
+            await get_redis().zadd(
+                self._queue_key(name, tenant), {job_id: time.time() + self.visibility_timeout}, xx=True
+            )
+
+    async def ack(self, name: str, job_id: str):
+        await self._forget(name, job_id)
+
+    async def release(self, name: str, job_id: str):
+        """Make a failed job visible again immediately so it is retried."""
+        tenant = await get_redis().hget(self._key(name, "tenant"), job_id)
+        if tenant is not None:
+            await get_redis().zadd(self._queue_key(name, tenant), {job_id: time.time()}, xx=True)
+
+    async def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth metrics per registered queue."""
+        redis = get_redis()
+        if redis is None:
+            return {}
+        now = time.time()
+        stats = {}
+        for name in self.handlers:
+            ready = in_flight = users = 0
+            for priority in self.priorities:
+                for tenant in await redis.zrange(self._key(name, f"turns:{priority}"), 0, -1):
+                    queue_key = self._queue_key(name, tenant)
+                    ready += await redis.zcount(queue_key, "-inf", now)
+                    in_flight += await redis.zcount(queue_key, f"({now}", "+inf")
+                    users += 1
+            stats[name] = {
+                "ready": ready,
+                "in_flight": in_flight,
+                "users": users,
+                "dead": await redis.llen(self._key(name, "dead")),
+            }
+        return stats
+
+    async def _dead(self, name: str, job_id: str, payload: Dict[str, Any]):
+        handler = self.dead_handlers.get(name)
+        if handler is None:
+            return
+        try:
+            await handler(**payload)
+        except Exception as e:
+            # The job is already dead-lettered; keep claiming
+            logger.error(f"Dead-letter handler for {name}:{job_id} failed: {e}")
+
+    async def _forget(self, name: str, job_id: str, tenant: Optional[str] = None):
+        redis = get_redis()
+        if tenant is None:
+            tenant = await redis.hget(self._key(name, "tenant"), job_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            if tenant is not None:
+                pipe.zrem(self._queue_key(name, tenant), job_id)
+            pipe.hdel(self._key(name, "tenant"), job_id)
+            pipe.hdel(self._key(name, "data"), job_id)
+            pipe.hdel(self._key(name, "attempts"), job_id)
+            pipe.delete(self._secret_key(name, job_id))
+            await pipe.execute()
+
+    def _tenant(self, payload: Dict[str, Any]) -> Tuple[str, str]:
+        """(priority, user) sub-queue of a job, from its payload."""
+        priority = payload.get("priority")
+        if priority not in self.priorities:
+            priority = self.priorities[-1]
+        user_id = payload.get("user_id")
+        tenant = SYSTEM_TENANT if user_id is None else str(user_id)
+        # Same user, different priority (e.g. after buying credits): separate sub-queues
+        return priority, f"{priority}:{tenant}"
+
+    async def _load_secrets(self, name: str, job_id: str) -> Dict[str, Any]:
+        token = await get_redis().get(self._secret_key(name, job_id))
+        if token is None:
+            if self.secret_fields.get(name):
+                # Expired (or the job had none): handlers fall back to server keys
+                logger.warning(f"Job {name}:{job_id} has no stored secrets")
+            return {}
+        from cryptography.fernet import InvalidToken
+        try:
+            return json.loads(self._cipher().decrypt(token.encode("ascii"), ttl=self.secret_ttl))
+        except InvalidToken:
+            logger.warning(f"Job {name}:{job_id} secrets could not be decrypted or have expired")
+            return {}
+
+    def _cipher(self):
+        if self._fernet is None:
+            from cryptography.fernet import Fernet
+            from app.core.security import SECRET_KEY
+
+            secret = os.getenv("JOB_SECRET_KEY") or SECRET_KEY
+            key = base64.urlsafe_b64encode(hashlib.sha256(f"job-secrets:{secret}".encode("utf-8")).digest())
+            self._fernet = Fernet(key)
+        return self._fernet
+
+    def _key(self, name: str, suffix: str) -> str:
+        return f"jobs:{name}:{suffix}"
+
+    def _queue_key(self, name: str, tenant: str) -> str:
+        return f"jobs:{name}:queue:{tenant}"
+
+    def _secret_key(self, name: str, job_id: str) -> str:
+        return f"jobs:{name}:secret:{job_id}"
+
+
+job_queue = JobQueue(
+    visibility_timeout=int(os.getenv("JOB_VISIBILITY_TIMEOUT", "600")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    # Users' API keys are only kept this long for queued jobs
+    secret_ttl=int(os.getenv("JOB_SECRET_TTL", "3600")),
+    dead_letter_max=int(os.getenv("JOB_DEAD_LETTER_MAX", "1000")),
+    # Matches the LLM scheduler's paid_share
+    priority_share=int(os.getenv("LLM_PAID_SHARE", "3")),
+)
@@ -0,0 +1,28 @@
+import os
+
+# e.g. redis://localhost:6379/0 (see docker-compose.yml). "fakeredis://" gives an
+# in-memory server for tests and single-process local development; since no
+# other process can reach it, the API then consumes the job queue itself.
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client = None
+
+def get_redis():
+    """Returns the shared asyncio Redis client, or None when Redis is not configured."""
+    global _client
+    if not REDIS_URL:
+        return None
+
+    if _client is None:
+        if REDIS_URL.startswith("fakeredis://"):
+            import fakeredis
+            _client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        else:
+            import redis.asyncio as redis
+            _client = redis.from_url(REDIS_URL, decode_responses=True)
+    return _client
+
+
+def is_in_process_redis() -> bool:
+    """True for fakeredis://, whose data only exists inside this process."""
+    return bool(REDIS_URL) and REDIS_URL.startswith("fakeredis://")
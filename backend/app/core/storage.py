@@ -2,7 +2,7 @@ import os
 import shutil
 import boto3
 from fastapi import UploadFile
-from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import NoCredentialsError, ClientError
 
 class StorageService:
     def __init__(self):
@@ -51,6 +51,50 @@ class StorageService:
             
         return full_path
 
+    def save_bytes(self, data: bytes, filename: str, content_type: str) -> str:
+        """Stores generated bytes; returns the S3 URI or the key relative to local storage."""
+        if self.s3_client:
+            self.s3_client.put_object(
+                Bucket=self.s3_bucket,
+                Key=filename,
+                Body=data,
+                ContentType=content_type
+            )
+            return f"s3://{self.s3_bucket}/{filename}"
+        
+        full_path = os.path.join(self.local_storage_path, filename)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+        return filename
+
+    def exists(self, filename: str) -> bool:
+        """Whether an object saved with save_bytes(filename) is present."""
+        if self.s3_client:
+            try:
+                self.s3_client.head_object(Bucket=self.s3_bucket, Key=filename)
+                return True
+            except ClientError:
+                return False
+        return os.path.exists(os.path.join(self.local_storage_path, filename))
+
+    def get_key(self, filename: str) -> str:
+        """The key save_bytes(filename) returns, without writing anything."""
+        if self.s3_client:
+            return f"s3://{self.s3_bucket}/{filename}"
+        return filename
+
+    def get_file_fingerprint(self, file_path_or_key: str) -> str:
+        """Cheap identifier that changes whenever the stored object changes."""
+        if file_path_or_key.startswith("s3://"):
+            bucket, key = file_path_or_key.replace("s3://", "").split("/", 1)
+            head = self.s3_client.head_object(Bucket=bucket, Key=key)
+            etag = head["ETag"].strip('"')
+            return f"etag:{etag}"
+        
+        stat = os.stat(file_path_or_key)
+        return f"stat:{stat.st_size}:{stat.st_mtime_ns}"
+
     def get_file_url(self, file_path_or_key: str) -> str:
         if not file_path_or_key: return ""
         
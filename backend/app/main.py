@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -34,5 +35,32 @@ def root():
     return {"message": "Welcome to AI Resume Platform API"}
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
+
+@app.on_event("startup")
+async def start_in_process_worker():
+    # A fakeredis:// queue is invisible to `python -m app.worker` processes,
+    # so jobs are consumed here instead
+    from .core.redis import is_in_process_redis
+    if is_in_process_redis():
+        from .worker import run_worker, DEFAULT_CONCURRENCY
+        app.state.in_process_worker = asyncio.create_task(run_worker([], DEFAULT_CONCURRENCY))
+
+@app.on_event("shutdown")
+async def stop_in_process_worker():
+    worker = getattr(app.state, "in_process_worker", None)
+    if worker is not None:
+        worker.cancel()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    from .services.llm_clients import llm_client_pool
+    await llm_client_pool.close_all()
+
+@app.on_event("shutdown")
+def shutdown_process_pools():
+    from .services.documents import render_pool
+    from .utils.text_extractor import extraction_pool
+    render_pool.shutdown()
+    extraction_pool.shutdown()
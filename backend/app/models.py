@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SAEnum, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, Enum as SAEnum, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .db.session import Base
@@ -42,6 +42,23 @@ class Resume(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("User", back_populates="resumes")
+    extracted_text = relationship("ResumeText", back_populates="resume", uselist=False, cascade="all, delete-orphan")
+
+class ResumeText(Base):
+    """Text extracted from a resume's original upload, reused by every pipeline step."""
+    __tablename__ = "resume_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), unique=True, index=True)
+    text = Column(Text)
+    page_count = Column(Integer, nullable=True)
+    char_count = Column(Integer)
+    text_hash = Column(String) # SHA-256 of text
+    source_fingerprint = Column(String) # ETag / size+mtime of the original it was extracted from
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    resume = relationship("Resume", back_populates="extracted_text")
 
 class CreditTransaction(Base):
     __tablename__ = "credit_transactions"
@@ -54,3 +71,31 @@ class CreditTransaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="transactions")
+
+class RenderBatchStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class RenderBatch(Base):
+    """Admin-triggered re-render of every completed resume (e.g. after a theme change)."""
+    __tablename__ = "render_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(SAEnum(RenderBatchStatus), default=RenderBatchStatus.PENDING)
+    generator_version = Column(String)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    last_resume_id = Column(Integer, default=0) # Cursor: every resume up to this id is done
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    rendered = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    elapsed_seconds = Column(Float, default=0.0) # Time spent rendering, summed across runs
+    error = Column(String, nullable=True)
+    lease_owner = Column(String, nullable=True) # Run currently processing the batch
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True) # Renewed while that run is alive
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
@@ -0,0 +1,138 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU with TTL."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0}
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def incr(self, counter: str):
+        self._counters[counter] += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "entries": len(self._entries), "backend": "memory"}
+
+
+class RedisCacheBackend:
+    """Shared cache across API and worker processes; Redis handles TTL eviction."""
+
+    def __init__(self, ttl: int, prefix: str = "analysis_cache"):
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await get_redis().get(f"{self.prefix}:{key}")
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        await get_redis().set(f"{self.prefix}:{key}", json.dumps(value), ex=self.ttl)
+
+    async def incr(self, counter: str):
+        await get_redis().hincrby(f"{self.prefix}:stats", counter, 1)
+
+    async def stats(self) -> Dict[str, Any]:
+        counters = await get_redis().hgetall(f"{self.prefix}:stats")
+        return {
+            "hits": int(counters.get("hits", 0)),
+            "misses": int(counters.get("misses", 0)),
+            "backend": "redis",
+        }
+
+
+class AnalysisCache:
+    """
+    Stores analysis results keyed by the resume text and everything else that
+    determines the LLM output, so re-analyzing an identical upload is served
+    without another LLM call. Cache failures never fail an analysis.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def make_key(
+        self,
+        text: str,
+        provider: str,
+        model: str,
+        prompt_version: str
+    ) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        parts = [text_hash, provider, model, prompt_version]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            value = await self.backend.get(key)
+            await self.backend.incr("hits" if value is not None else "misses")
+            return value
+        except Exception as e:
+            logger.warning(f"Analysis cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return {"enabled": True, **(await self.backend.stats())}
+
+
+def _create_backend():
+    # ANALYSIS_CACHE_BACKEND: "memory", "redis" or "off" (default: redis when
+    # REDIS_URL is configured, otherwise memory)
+    backend = os.getenv("ANALYSIS_CACHE_BACKEND") or ("redis" if get_redis() else "memory")
+    ttl = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+    if backend == "off":
+        return None
+    if backend == "redis":
+        return RedisCacheBackend(ttl=ttl)
+    return InMemoryCacheBackend(
+        max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024")),
+        ttl=ttl,
+    )
+
+analysis_cache = AnalysisCache(_create_backend())
@@ -1,5 +1,7 @@
-from app.services.llm import llm
+from app.services.llm import llm, FieldCallback
+from app.services.analysis_cache import analysis_cache
 from typing import Dict, Any, Optional
+import hashlib
 
 # ATS-Optimized Resume Analysis Prompt
 ANALYSIS_SYSTEM_PROMPT = """You are an expert Executive Resume Writer, Career Coach, and ATS (Applicant Tracking System) Specialist with 15+ years of experience.
@@ -65,21 +67,41 @@ IMPORTANT:
 - Extract actual information from the resume, don't make up data
 """
 
+# Changes to the prompt invalidate cached analyses
+PROMPT_VERSION = hashlib.sha256(ANALYSIS_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
 async def analyze_resume_text(
     text: str, 
     api_keys: Dict[str, str] = None,
     provider: str = None,
-    model: str = None
+    model: str = None,
+    on_field: Optional[FieldCallback] = None
 ) -> Dict[str, Any]:
     """
     Analyze resume text using LLM.
     
+    Identical requests (same text, provider, model and prompt version) are
+    served from the analysis cache. Responses from a failover or alternate
+    hedge provider are not cached under the requested provider's key.
+    
     Args:
         text: Extracted text from the resume
         api_keys: API keys for LLM providers
         provider: LLM provider to use
         model: Specific model to use
+        on_field: Optional callback awaited with each top-level field of the
+            result as soon as it is available (streamed from the LLM, or
+            replayed from the cache)
     """
+    resolved_provider, _, resolved_model = llm.resolve_provider(api_keys, provider, model)
+    cache_key = analysis_cache.make_key(text, resolved_provider, resolved_model, PROMPT_VERSION)
+    cached = await analysis_cache.get(cache_key)
+    if cached is not None:
+        if on_field:
+            for key, value in cached.items():
+                await on_field(key, value)
+        return cached
+    
     prompt = f"""Analyze the following resume text carefully. Extract all relevant information and identify areas for improvement.
 
 === RESUME TEXT START ===
@@ -94,11 +116,16 @@ Based on this resume:
 
 Return your analysis as a JSON object following the specified format."""
     
+    answered_by = []
     result = await llm.generate_json(
         prompt, 
         ANALYSIS_SYSTEM_PROMPT, 
         api_keys,
         provider=provider,
-        model=model
+        model=model,
+        on_field=on_field,
+        on_answer=lambda *source: answered_by.append(source)
     )
+    if answered_by == [(resolved_provider, resolved_model)]:
+        await analysis_cache.set(cache_key, result)
     return result
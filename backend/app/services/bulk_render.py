@@ -0,0 +1,234 @@
+"""
+Re-renders the generated PDF of every completed resume, e.g. after a theme
+or layout change in pdf_generator.py (bump GENERATOR_VERSION first, or the
+existing renders are reused as-is).
+
+Resumes are read in id order in chunks of RERENDER_CHUNK_SIZE. Each chunk is
+rendered concurrently in the render process pool, then its keys and the
+batch cursor are written in one transaction, so an interrupted batch resumes
+after the last committed chunk.
+
+A run holds a lease on its batch and renews it while alive. A second run of
+the same batch (a duplicate job, or an admin resume) exits unless the lease
+has expired, i.e. the process holding it crashed.
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.sql import func
+
+from app.db.session import session_scope
+from app.models import RenderBatch, RenderBatchStatus, Resume, ResumeStatus
+from app.core.storage import storage
+from app.services.documents import artifact_filename, render_document
+from app.services.pdf_generator import GENERATOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+RERENDER_CHUNK_SIZE = int(os.getenv("RERENDER_CHUNK_SIZE", "50"))
+RERENDER_LEASE_SECONDS = int(os.getenv("RERENDER_LEASE_SECONDS", "120"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def lease_is_live(batch: RenderBatch) -> bool:
+    """Whether a run is (still) processing the batch."""
+    expires = batch.lease_expires_at
+    if batch.status != RenderBatchStatus.RUNNING or expires is None:
+        return False
+    if expires.tzinfo is None:
+        # SQLite drops the offset; leases are written in UTC
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires > _now()
+
+
+def batch_in_progress(batch: RenderBatch) -> bool:
+    """Queued, or running under a live lease. A RUNNING batch whose lease lapsed was interrupted."""
+    return batch.status == RenderBatchStatus.PENDING or lease_is_live(batch)
+
+
+def batch_progress(batch: RenderBatch) -> Dict[str, Any]:
+    """Progress and throughput of a batch, as returned by the admin API."""
+    elapsed = batch.elapsed_seconds or 0.0
+    return {
+        "id": batch.id,
+        "status": batch.status.value if batch.status else None,
+        "generator_version": batch.generator_version,
+        "total": batch.total,
+        "processed": batch.processed,
+        "rendered": batch.rendered,
+        "failed": batch.failed,
+        # `total` is counted when the batch is created; resumes completed
+        # since then are processed too, so cap at 100
+        "percent": min(100.0, round(100 * batch.processed / batch.total, 1)) if batch.total else 100.0,
+        "elapsed_seconds": round(elapsed, 2),
+        "resumes_per_sec": round(batch.processed / elapsed, 2) if elapsed else None,
+        "last_resume_id": batch.last_resume_id,
+        "error": batch.error,
+        "interrupted": batch.status == RenderBatchStatus.RUNNING and not lease_is_live(batch),
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+        "completed_at": batch.completed_at.isoformat() if batch.completed_at else None,
+    }
+
+
+def create_render_batch(db, user_id: Optional[int] = None) -> RenderBatch:
+    total = db.query(func.count(Resume.id)).filter(Resume.status == ResumeStatus.COMPLETED).scalar()
+    batch = RenderBatch(
+        status=RenderBatchStatus.PENDING,
+        generator_version=GENERATOR_VERSION,
+        created_by=user_id,
+        total=total,
+        last_resume_id=0,
+    )
+    db.add(batch)
+    db.commit()
+    db.refresh(batch)
+    return batch
+
+
+def _next_chunk(cursor: int) -> List[tuple]:
+    with session_scope() as db:
+        return db.query(
+            Resume.id, Resume.analysis_result, Resume.s3_key_generated_docx, Resume.updated_at
+        ).filter(
+            Resume.status == ResumeStatus.COMPLETED,
+            Resume.id > cursor
+        ).order_by(Resume.id).limit(RERENDER_CHUNK_SIZE).all()
+
+
+async def _render_row(analysis: Optional[dict]) -> Optional[str]:
+    content = (analysis or {}).get("rewritten_content")
+    if not content:
+        return None
+    # Raise on failure rather than storing an error document nobody would use
+    return await render_document(
+        content, "pdf", analysis.get("rewrite_template") or "professional", store_errors=False
+    )
+
+
+def _acquire_lease(batch_id: int, owner: str) -> bool:
+    """Take the batch's lease unless another live run holds it (one UPDATE, so two runs cannot both win)."""
+    now = _now()
+    with session_scope() as db:
+        taken = db.query(RenderBatch).filter(
+            RenderBatch.id == batch_id,
+            RenderBatch.status != RenderBatchStatus.COMPLETED,
+            (RenderBatch.status != RenderBatchStatus.RUNNING)
+            | RenderBatch.lease_expires_at.is_(None)
+            | (RenderBatch.lease_expires_at < now)
+        ).update({
+            RenderBatch.status: RenderBatchStatus.RUNNING,
+            RenderBatch.error: None,
+            RenderBatch.lease_owner: owner,
+            RenderBatch.lease_expires_at: now + timedelta(seconds=RERENDER_LEASE_SECONDS),
+        }, synchronize_session=False)
+    return taken == 1
+
+
+def _renew_lease(batch_id: int, owner: str) -> bool:
+    with session_scope() as db:
+        renewed = db.query(RenderBatch).filter(
+            RenderBatch.id == batch_id, RenderBatch.lease_owner == owner
+        ).update({
+            RenderBatch.lease_expires_at: _now() + timedelta(seconds=RERENDER_LEASE_SECONDS)
+        }, synchronize_session=False)
+    return renewed == 1
+
+
+class LeaseLost(RuntimeError):
+    """Another run took over the batch (this one stalled past its lease)."""
+
+
+async def run_render_batch(batch_id: int):
+    """Job handler: process the batch from its cursor until every resume is done."""
+    owner = uuid.uuid4().hex
+    if not await asyncio.to_thread(_acquire_lease, batch_id, owner):
+        logger.info(f"Render batch {batch_id} is completed, missing or being run elsewhere; skipping")
+        return
+    with session_scope() as db:
+        cursor = db.query(RenderBatch.last_resume_id).filter(RenderBatch.id == batch_id).scalar() or 0
+
+    async def keep_leased():
+        while True:
+            await asyncio.sleep(RERENDER_LEASE_SECONDS / 3)
+            if not await asyncio.to_thread(_renew_lease, batch_id, owner):
+                return
+
+    heartbeat = asyncio.create_task(keep_leased())
+    try:
+        while True:
+            rows = await asyncio.to_thread(_next_chunk, cursor)
+            if not rows:
+                break
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(_render_row(row.analysis_result) for row in rows), return_exceptions=True)
+
+            updates = []
+            rendered = failed = 0
+            for row, key in zip(rows, results):
+                if key is None:
+                    continue
+                if isinstance(key, BaseException):
+                    # Keep serving the previous PDF
+                    logger.error(f"Re-render of resume {row.id} failed: {key!r}")
+                    failed += 1
+                    continue
+                rendered += 1
+                update = {"id": row.id, "s3_key_generated_pdf": key}
+                # A DOCX from an older generator version is dropped and
+                # rendered again on its next download
+                content = row.analysis_result["rewritten_content"]
+                if row.s3_key_generated_docx and row.s3_key_generated_docx != storage.get_key(artifact_filename(content, "docx")):
+                    update["s3_key_generated_docx"] = None
+                updates.append((row.updated_at, update))
+
+            cursor = rows[-1].id
+            with session_scope() as db:
+                # Skip resumes changed (e.g. rewritten again) while rendering
+                current = dict(db.query(Resume.id, Resume.updated_at).filter(Resume.id.in_([u["id"] for _, u in updates])).all())
+                db.bulk_update_mappings(Resume, [u for seen, u in updates if current.get(u["id"]) == seen])
+                batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+                if batch.lease_owner != owner:
+                    # Rolled back: the run that took over redoes this chunk
+                    raise LeaseLost(f"Render batch {batch_id} was taken over by another run")
+                batch.lease_expires_at = _now() + timedelta(seconds=RERENDER_LEASE_SECONDS)
+                batch.last_resume_id = cursor
+                batch.processed = (batch.processed or 0) + len(rows)
+                batch.rendered = (batch.rendered or 0) + rendered
+                batch.failed = (batch.failed or 0) + failed
+                batch.elapsed_seconds = (batch.elapsed_seconds or 0.0) + (time.perf_counter() - started)
+                progress = batch_progress(batch)
+
+            logger.info(
+                f"Render batch {batch_id}: {progress['processed']}/{progress['total']} resumes, "
+                f"{progress['failed']} failed, {progress['resumes_per_sec']} resumes/s"
+            )
+    except LeaseLost as e:
+        logger.warning(str(e))
+        return
+    except Exception as e:
+        logger.error(f"Render batch {batch_id} stopped at resume {cursor}: {e}")
+        with session_scope() as db:
+            batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+            if batch.lease_owner == owner:
+                batch.status = RenderBatchStatus.FAILED
+                batch.error = str(e)
+                batch.lease_owner = batch.lease_expires_at = None
+        raise
+    finally:
+        heartbeat.cancel()
+
+    with session_scope() as db:
+        batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+        if batch.lease_owner == owner:
+            batch.status = RenderBatchStatus.COMPLETED
+            batch.completed_at = func.now()
+            batch.lease_owner = batch.lease_expires_at = None
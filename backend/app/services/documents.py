@@ -0,0 +1,120 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.storage import storage
+from app.core.process_pool import ProcessPool
+from app.services.pdf_generator import pdf_generator, render_format, render_error, GENERATOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+PDF_CONTENT_TYPE = "application/pdf"
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Rendered documents are content-addressed and shared between resumes (see
+# artifact_filename()), so a file may only be deleted once no resume
+# references it any more.
+RENDER_CACHE_PREFIX = "renders/"
+# Error documents for failed renders; never reused
+FAILED_RENDER_PREFIX = f"{RENDER_CACHE_PREFIX}failed/"
+
+# Output formats: content type and whether the layout depends on the
+# template. Only the PDF is rendered when a rewrite completes; other formats
+# are rendered on first download (see render_document()).
+FORMATS = {
+    "pdf": (PDF_CONTENT_TYPE, True),
+    "docx": (DOCX_CONTENT_TYPE, False),
+}
+EAGER_FORMATS = ("pdf",)
+
+# fpdf2 and python-docx are CPU-bound; renders run in worker processes so
+# they never block the event loop of the API or a job worker.
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+render_pool = ProcessPool(
+    "render",
+    size=int(os.getenv("RENDER_POOL_SIZE", str(min(2, multiprocessing.cpu_count())))),
+    max_tasks_per_child=int(os.getenv("RENDER_MAX_TASKS_PER_CHILD", "50")),
+)
+
+# Renders in progress in this process, keyed by artifact filename, so
+# simultaneous requests for the same document share one render
+_in_flight: Dict[str, "asyncio.Task[str]"] = {}
+
+
+def artifact_filename(content: Dict[str, Any], fmt: str, template: Optional[str] = None) -> str:
+    """
+    Storage filename for a rendered document, derived from the normalized
+    content, the template (for formats whose layout uses it) and the
+    generator version. Identical inputs map to the same file.
+    """
+    theme = template if FORMATS[fmt][1] else ""
+    digest = hashlib.sha256(
+        "|".join([GENERATOR_VERSION, fmt, theme or "", pdf_generator.content_hash(content)]).encode("utf-8")
+    ).hexdigest()
+    return f"{RENDER_CACHE_PREFIX}{digest}.{fmt}"
+
+
+async def _render_cached(content: Dict[str, Any], fmt: str, template: str) -> str:
+    filename = artifact_filename(content, fmt, template)
+    content_type = FORMATS[fmt][0]
+    if await asyncio.to_thread(storage.exists, filename):
+        return storage.get_key(filename)
+    data = await render_pool.run(render_format, content, fmt, template, True, timeout=RENDER_TIMEOUT)
+    return await asyncio.to_thread(storage.save_bytes, data, filename, content_type)
+
+
+def is_failed_render(file_key: str) -> bool:
+    return FAILED_RENDER_PREFIX in (file_key or "")
+
+
+async def render_document(
+    content: Dict[str, Any], fmt: str, template: str, store_errors: bool = True
+) -> str:
+    """
+    Renders and stores one format of the rewritten content, returning its
+    storage key. Concurrent calls for the same output wait on a single render.
+
+    If rendering fails, an error document is stored and its key returned
+    (see is_failed_render()), or with `store_errors=False` the error is raised.
+    """
+    filename = artifact_filename(content, fmt, template)
+    task = _in_flight.get(filename)
+    if task is None:
+        task = asyncio.ensure_future(_render_cached(content, fmt, template))
+        _in_flight[filename] = task
+        task.add_done_callback(lambda _: _in_flight.pop(filename, None))
+    try:
+        # shield: a client disconnecting must not cancel the render other waiters share
+        return await asyncio.shield(task)
+    except Exception as e:
+        logger.error(f"Rendering {filename} failed: {e!r}")
+        if not store_errors:
+            raise
+        error = str(e) or "Rendering timed out"
+    # Store an error document, but never under the content-addressed name,
+    # so the next render retries
+    data = render_error(fmt, error)
+    return await asyncio.to_thread(
+        storage.save_bytes, data, f"{FAILED_RENDER_PREFIX}{uuid.uuid4()}.{fmt}", FORMATS[fmt][0]
+    )
+
+
+async def render_documents(
+    content: Dict[str, Any], template: str, formats: Iterable[str] = EAGER_FORMATS
+) -> Dict[str, str]:
+    """
+    Renders rewritten resume content to the given formats (PDF by default)
+    and stores them. Formats are rendered concurrently in the render pool.
+
+    Only needs the stored `rewritten_content`, so a template switch re-renders
+    without another LLM call, and outputs that already exist in storage for the
+    same content/template/generator version are reused instead of rendered.
+    Returns the storage keys by format.
+    """
+    formats = list(formats)
+    keys = await asyncio.gather(*(render_document(content, fmt, template) for fmt in formats))
+    return dict(zip(formats, keys))
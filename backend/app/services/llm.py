@@ -1,10 +1,35 @@
 import os
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from app.services.llm_clients import llm_client_pool
+from app.services.llm_resilience import CircuitBreaker, RequestClock, circuit_breakers, hedger, is_retryable, llm_retrier
+from app.services.llm_scheduler import llm_scheduler
+from app.utils.json_stream import JSONFieldStream
 
 logger = logging.getLogger(__name__)
 
+# Awaited with (field name, value) as streamed fields complete
+FieldCallback = Callable[[str, Any], Awaitable[None]]
+
+# (provider, model, response, fields the call buffered instead of streaming)
+HedgedAnswer = Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, Any]]]]
+
+# Order in which providers are tried when failing over
+PROVIDERS = ["google", "openai", "anthropic"]
+
+# Route to another configured provider while one is failing
+LLM_FAILOVER = os.getenv("LLM_FAILOVER", "true").lower() == "true"
+
+# Backup requests for slow calls (LLM_HEDGING=true) go to the same
+# provider/model ("same") or to another provider we have a key for
+# ("alternate"). Every generate_json call is hedged, streamed ones included
+# (analysis): the backup's fields are buffered and only sent if it wins, in
+# which case they supersede any the slow primary had already streamed.
+LLM_HEDGE_TARGET = os.getenv("LLM_HEDGE_TARGET", "same")
+
 # Available models per provider
 AVAILABLE_MODELS = {
     "google": [
@@ -46,23 +71,17 @@ class LLMService:
         """Returns available models per provider."""
         return AVAILABLE_MODELS
         
-    async def generate_json(
-        self, 
-        prompt: str, 
-        system_prompt: str, 
+    def resolve_provider(
+        self,
         api_keys: Dict[str, str] = None,
         provider: str = None,
         model: str = None
-    ) -> Dict[str, Any]:
+    ) -> Tuple[str, Optional[str], str]:
         """
-        Generate JSON response from LLM.
+        Resolve which provider, API key and model a request will use.
         
-        Args:
-            prompt: User prompt with CV content
-            system_prompt: System instructions
-            api_keys: Dict with provider keys (openai, google, anthropic)
-            provider: Specific provider to use (google, openai, anthropic)
-            model: Specific model name to use
+        Returns:
+            (provider, api_key or None, model)
         """
         # 1. Resolve API Keys (Request > Environment)
         req_openai = api_keys.get("openai") if api_keys else None
@@ -106,23 +125,103 @@ class LLMService:
                 active_model = "gpt-5.1-2025-11-13"
             elif active_provider == "anthropic":
                 active_model = "claude-sonnet-4-5"
-                
+        
+        return active_provider, active_key, active_model
+        
+    async def generate_json(
+        self, 
+        prompt: str, 
+        system_prompt: str, 
+        api_keys: Dict[str, str] = None,
+        provider: str = None,
+        model: str = None,
+        on_field: Optional[FieldCallback] = None,
+        on_answer: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate JSON response from LLM.
+        
+        Args:
+            prompt: User prompt with CV content
+            system_prompt: System instructions
+            api_keys: Dict with provider keys (openai, google, anthropic)
+            provider: Specific provider to use (google, openai, anthropic)
+            model: Specific model name to use
+            on_field: If given, the response is streamed and this is awaited
+                with (name, value) for each top-level field as soon as it is
+                complete; the full object is still returned at the end. If a
+                hedge wins, its fields are sent again afterwards and replace
+                those already streamed by the slow call
+            on_answer: If given, called with the (provider, model) that
+                produced the returned response, which differs from the
+                requested one after a failover or an alternate hedge
+        """
+        active_provider, active_key, active_model = self.resolve_provider(api_keys, provider, model)
+        
         logger.info(f"LLM Request: provider={active_provider}, model={active_model}, has_key={bool(active_key)}")
         
-        # 3. Check for API key
+        # 1. Check for API key
         if not active_key:
             raise ValueError(f"No API key provided for {active_provider}. Please add your API key in Settings.")
         
-        # 4. Make LLM Call
+        # 2. Make LLM Call: the requested provider first, then (while its
+        # circuit is open or it keeps failing) any other provider we have a
+        # key for, with that provider's default model
+        targets = [(active_provider, active_key, active_model)]
+        if LLM_FAILOVER:
+            targets += self.failover_targets(api_keys, active_provider)
+        
+        streamed = False
+        
+        async def forward_field(name: str, value: Any):
+            nonlocal streamed
+            streamed = True
+            await on_field(name, value)
+        
+        last_error = None
         try:
-            if active_provider == "google":
-                return await self._call_google(prompt, system_prompt, active_key, active_model)
-            elif active_provider == "openai":
-                return await self._call_openai(prompt, system_prompt, active_key, active_model)
-            elif active_provider == "anthropic":
-                return await self._call_anthropic(prompt, system_prompt, active_key, active_model)
-            else:
-                raise ValueError(f"Unknown provider: {active_provider}")
+            for target_provider, target_key, target_model in targets:
+                breaker = circuit_breakers.get(target_provider, target_model)
+                if not breaker.allow():
+                    logger.warning(f"Circuit open for {target_provider}/{target_model}, skipping")
+                    continue
+                if target_provider != active_provider:
+                    logger.warning(f"Failing over from {active_provider} to {target_provider}/{target_model}")
+                clock = RequestClock() if hedger.enabled else None
+                call = self._target_call(
+                    prompt, system_prompt, target_provider, target_key, target_model,
+                    forward_field if on_field is not None else None,
+                    breaker,
+                    can_retry=lambda: not streamed and breaker.available,
+                    clock=clock
+                )
+                try:
+                    if hedger.enabled:
+                        answered_provider, answered_model, result, hedge_fields = await hedger.run(
+                            (target_provider, target_model, self._unbuffered(call), clock),
+                            lambda: self._hedge_target(
+                                prompt, system_prompt, targets, target_provider, target_key, target_model,
+                                stream=on_field is not None
+                            )
+                        )
+                        # A streamed hedge won: its fields were held back
+                        # while it raced the primary, send them now
+                        for name, value in hedge_fields or []:
+                            await forward_field(name, value)
+                    else:
+                        answered_provider, answered_model, result = await call()
+                    if on_answer is not None:
+                        on_answer(answered_provider, answered_model)
+                    return result
+                except Exception as e:
+                    # Caller errors would fail on any provider, and streamed
+                    # output cannot be taken back
+                    if streamed or not is_retryable(e):
+                        raise
+                    last_error = e
+            if last_error is not None:
+                raise last_error
+            raise ValueError(f"{active_provider} is temporarily unavailable. Please try again in a few minutes.")
                 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response as JSON: {e}")
@@ -131,60 +230,189 @@ class LLMService:
             logger.error(f"LLM call failed: {e}")
             raise
     
-    async def _call_google(self, prompt: str, system_prompt: str, api_key: str, model: str) -> Dict[str, Any]:
-        """Call Google Gemini API."""
-        import google.generativeai as genai
+    def failover_targets(self, api_keys: Dict[str, str], exclude: str) -> List[Tuple[str, str, str]]:
+        """(provider, key, default model) for every other provider with a key."""
+        targets = []
+        for provider in PROVIDERS:
+            if provider == exclude:
+                continue
+            _, key, model = self.resolve_provider(api_keys, provider, None)
+            if key:
+                targets.append((provider, key, model))
+        return targets
+    
+    def _hedge_target(
+        self,
+        prompt: str,
+        system_prompt: str,
+        targets: List[Tuple[str, str, str]],
+        provider: str,
+        api_key: str,
+        model: str,
+        stream: bool = False
+    ) -> Optional[Tuple[str, str, Callable[[], Awaitable[HedgedAnswer]], RequestClock]]:
+        """
+        Backup request for a slow call: the next healthy provider, or the same
+        one again. Providers whose concurrency slots are all taken are
+        skipped, since a backup would only queue behind other calls. For a
+        streamed call the backup streams too, but into a buffer returned with
+        its answer: only the winner's fields reach the caller's on_field.
+        """
+        candidates = [(provider, api_key, model)]
+        if LLM_HEDGE_TARGET == "alternate":
+            candidates = [t for t in targets if t[0] != provider] + candidates
+        for hedge_provider, hedge_key, hedge_model in candidates:
+            if not llm_scheduler.has_capacity(hedge_provider, hedge_key):
+                continue
+            breaker = circuit_breakers.get(hedge_provider, hedge_model)
+            if not breaker.available or not breaker.allow():
+                continue
+            fields: List[Tuple[str, Any]] = []
+            
+            async def buffer_field(name: str, value: Any):
+                fields.append((name, value))
+            
+            clock = RequestClock()
+            call = self._target_call(
+                prompt, system_prompt, hedge_provider, hedge_key, hedge_model,
+                buffer_field if stream else None,
+                breaker,
+                can_retry=lambda: not fields and breaker.available,
+                clock=clock
+            )
+            
+            async def buffered_call() -> HedgedAnswer:
+                return (*await call(), fields if stream else None)
+            
+            return hedge_provider, hedge_model, buffered_call, clock
+        return None
+    
+    @staticmethod
+    def _unbuffered(call: Callable[[], Awaitable[Tuple[str, str, Dict[str, Any]]]]) -> Callable[[], Awaitable[HedgedAnswer]]:
+        """The primary side of a hedge: its fields (if any) went straight to on_field."""
+        async def unbuffered_call() -> HedgedAnswer:
+            return (*await call(), None)
+        return unbuffered_call
+    
+    def _target_call(
+        self,
+        prompt: str,
+        system_prompt: str,
+        provider: str,
+        api_key: str,
+        model: str,
+        on_field: Optional[FieldCallback],
+        breaker: CircuitBreaker,
+        can_retry: Callable[[], bool],
+        clock: Optional[RequestClock] = None
+    ) -> Callable[[], Awaitable[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        One provider/model as a zero-argument coroutine function returning
+        (provider, model, response), retrying transient errors. Every attempt
+        waits for a scheduler slot (retry back-off does not hold one), times
+        out with what is left of the retry deadline and is reported to its
+        breaker; `clock` is running while an attempt holds its slot.
+        """
+        started = None
+        
+        async def request() -> Dict[str, Any]:
+            nonlocal started
+            # Waiting for a concurrency slot is not provider latency
+            async with llm_scheduler.slot(provider, api_key):
+                started = time.monotonic()
+                if clock is not None:
+                    clock.start()
+                try:
+                    if on_field is not None:
+                        return await self._stream_json(prompt, system_prompt, provider, api_key, model, on_field)
+                    return await self._call(prompt, system_prompt, provider, api_key, model)
+                finally:
+                    if clock is not None:
+                        clock.stop()
         
-        genai.configure(api_key=api_key)
-        gemini_model = genai.GenerativeModel(model)
+        async def attempt(timeout: float) -> Dict[str, Any]:
+            nonlocal started
+            started = None
+            try:
+                # SDK timeouts run to minutes: the retry deadline bounds each attempt
+                result = await asyncio.wait_for(request(), timeout)
+            except Exception as e:
+                if started is None:
+                    # Timed out (or failed) before reaching the provider
+                    breaker.release()
+                else:
+                    breaker.record(failed=is_retryable(e), elapsed=time.monotonic() - started)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record(failed=False, elapsed=time.monotonic() - started)
+            return result
         
+        async def call() -> Tuple[str, str, Dict[str, Any]]:
+            return provider, model, await llm_retrier.run(provider, attempt, can_retry=can_retry)
+        
+        return call
+    
+    async def _call(self, prompt: str, system_prompt: str, provider: str, api_key: str, model: str) -> Dict[str, Any]:
+        if provider == "google":
+            return await self._call_google(prompt, system_prompt, api_key, model)
+        elif provider == "openai":
+            return await self._call_openai(prompt, system_prompt, api_key, model)
+        elif provider == "anthropic":
+            return await self._call_anthropic(prompt, system_prompt, api_key, model)
+        else:
+            raise ValueError(f"Unknown provider: {provider}")
+    
+    # Provider calls use the SDKs' native async clients, borrowed from a warm
+    # per-(provider, key, model) pool, so a slow completion only suspends the
+    # calling task instead of blocking the event loop.
+    async def _call_google(self, prompt: str, system_prompt: str, api_key: str, model: str) -> Dict[str, Any]:
+        """Call Google Gemini API."""
         full_prompt = f"{system_prompt}\n\n{prompt}"
         
-        response = gemini_model.generate_content(
-            full_prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
+        async with llm_client_pool.client("google", api_key, model) as gemini_model:
+            response = await gemini_model.generate_content_async(
+                full_prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
         
         return json.loads(response.text)
     
     async def _call_openai(self, prompt: str, system_prompt: str, api_key: str, model: str) -> Dict[str, Any]:
         """Call OpenAI API."""
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        async with llm_client_pool.client("openai", api_key, model) as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
         
         return json.loads(response.choices[0].message.content)
     
     async def _call_anthropic(self, prompt: str, system_prompt: str, api_key: str, model: str) -> Dict[str, Any]:
         """Call Anthropic Claude API."""
-        import anthropic
-        
-        client = anthropic.Anthropic(api_key=api_key)
-        
         # Claude requires JSON instruction in user prompt
         json_prompt = f"{prompt}\n\nIMPORTANT: Respond ONLY with valid JSON, no other text."
         
-        response = client.messages.create(
-            model=model,
-            max_tokens=8192,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": json_prompt}
-            ]
-        )
+        async with llm_client_pool.client("anthropic", api_key, model) as client:
+            response = await client.messages.create(
+                model=model,
+                max_tokens=8192,
+                system=system_prompt,
+                messages=[
+                    {"role": "user", "content": json_prompt}
+                ]
+            )
         
         # Extract text from response
-        text = response.content[0].text
-        
+        return self._parse_json_text(response.content[0].text)
+    
+    @staticmethod
+    def _parse_json_text(text: str) -> Dict[str, Any]:
         # Try to extract JSON if wrapped in markdown
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0].strip()
@@ -192,5 +420,75 @@ class LLMService:
             text = text.split("```")[1].split("```")[0].strip()
         
         return json.loads(text)
+    
+    # Streaming: same requests with stream=True, yielding text chunks
+    async def _stream_json(
+        self,
+        prompt: str,
+        system_prompt: str,
+        provider: str,
+        api_key: str,
+        model: str,
+        on_field: FieldCallback
+    ) -> Dict[str, Any]:
+        if provider == "google":
+            chunks = self._stream_google(prompt, system_prompt, api_key, model)
+        elif provider == "openai":
+            chunks = self._stream_openai(prompt, system_prompt, api_key, model)
+        elif provider == "anthropic":
+            chunks = self._stream_anthropic(prompt, system_prompt, api_key, model)
+        else:
+            raise ValueError(f"Unknown provider: {provider}")
+        
+        parser = JSONFieldStream()
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            for name, value in parser.feed(chunk):
+                await on_field(name, value)
+        return self._parse_json_text("".join(parts))
+    
+    async def _stream_google(self, prompt: str, system_prompt: str, api_key: str, model: str) -> AsyncIterator[str]:
+        full_prompt = f"{system_prompt}\n\n{prompt}"
+        
+        async with llm_client_pool.client("google", api_key, model) as gemini_model:
+            response = await gemini_model.generate_content_async(
+                full_prompt,
+                generation_config={"response_mime_type": "application/json"},
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.candidates and chunk.candidates[0].content.parts:
+                    yield chunk.text
+    
+    async def _stream_openai(self, prompt: str, system_prompt: str, api_key: str, model: str) -> AsyncIterator[str]:
+        async with llm_client_pool.client("openai", api_key, model) as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
+    async def _stream_anthropic(self, prompt: str, system_prompt: str, api_key: str, model: str) -> AsyncIterator[str]:
+        json_prompt = f"{prompt}\n\nIMPORTANT: Respond ONLY with valid JSON, no other text."
+        
+        async with llm_client_pool.client("anthropic", api_key, model) as client:
+            async with client.messages.stream(
+                model=model,
+                max_tokens=8192,
+                system=system_prompt,
+                messages=[
+                    {"role": "user", "content": json_prompt}
+                ]
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
 
 llm = LLMService()
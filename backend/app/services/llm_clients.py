@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import importlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Provider SDKs take up to a second to import; _create_client imports them
+# lazily, so they are imported off the event loop first
+SDK_MODULES = {
+    "google": ("google.generativeai", "google.ai.generativelanguage"),
+    "openai": ("openai",),
+    "anthropic": ("anthropic",),
+}
+
+# httpx-based clients load the CA bundle when constructed, so they are built
+# in a thread too; a grpc.aio channel has to be created on the event loop
+BUILT_OFF_LOOP = {"openai", "anthropic"}
+
+
+def hash_api_key(api_key: str) -> str:
+    """Short, non-reversible fingerprint of an API key for use in cache keys and logs."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _PooledClient:
+    def __init__(self, provider: str, client: Any):
+        self.provider = provider
+        self.client = client
+        self.loop = asyncio.get_running_loop()
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.evicted = False
+
+
+class LLMClientPool:
+    """
+    LRU pool of long-lived provider clients keyed by (provider, hashed key, model).
+
+    Reusing a client keeps its HTTP/gRPC connections warm between analyses, and
+    giving every API key its own client means concurrent BYO-key requests never
+    share (or overwrite) SDK-global configuration. Idle clients are evicted after
+    `idle_ttl` seconds and the pool never holds more than `max_size` clients;
+    clients that are mid-request when evicted are closed once released.
+    """
+
+    def __init__(self, max_size: int = 32, idle_ttl: float = 300.0):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._clients: "OrderedDict[Tuple[str, str, str], _PooledClient]" = OrderedDict()
+
+    @asynccontextmanager
+    async def client(self, provider: str, api_key: str, model: str):
+        """Borrow a warm client for the given provider/key/model."""
+        key = (provider, hash_api_key(api_key), model)
+        await self._evict_idle()
+
+        entry = self._clients.get(key)
+        if entry is not None and entry.loop is not asyncio.get_running_loop():
+            # Async clients are bound to the loop they were created on
+            self._discard(key)
+            entry = None
+
+        if entry is None:
+            await asyncio.to_thread(self._import_sdk, provider)
+            if provider in BUILT_OFF_LOOP:
+                client = await asyncio.to_thread(self._create_client, provider, api_key, model)
+            else:
+                client = self._create_client(provider, api_key, model)
+            entry = self._clients.get(key)
+            if entry is None or entry.loop is not asyncio.get_running_loop():
+                entry = _PooledClient(provider, client)
+                self._clients[key] = entry
+                await self._evict_overflow()
+            else:
+                # Another call created one for this key meanwhile
+                await self._close(_PooledClient(provider, client))
+                self._clients.move_to_end(key)
+        else:
+            self._clients.move_to_end(key)
+
+        entry.in_use += 1
+        try:
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.in_use == 0:
+                await self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy for monitoring."""
+        return {
+            "size": len(self._clients),
+            "max_size": self.max_size,
+            "in_use": sum(1 for entry in self._clients.values() if entry.in_use),
+        }
+
+    async def close_all(self):
+        """Close every pooled client (used on application shutdown)."""
+        for key in list(self._clients):
+            entry = self._discard(key)
+            if entry.in_use == 0:
+                await self._close(entry)
+
+    @staticmethod
+    def _import_sdk(provider: str):
+        for module in SDK_MODULES.get(provider, ()):
+            importlib.import_module(module)
+
+    def _create_client(self, provider: str, api_key: str, model: str) -> Any:
+        if provider == "google":
+            import google.generativeai as genai
+            from google.ai import generativelanguage as glm
+
+            # A dedicated async client per key instead of genai.configure(),
+            # which mutates process-global state shared by every request.
+            gemini_model = genai.GenerativeModel(model)
+            gemini_model._async_client = glm.GenerativeServiceAsyncClient(
+                client_options={"api_key": api_key},
+                transport="grpc_asyncio",
+            )
+            return gemini_model
+        elif provider == "openai":
+            from openai import AsyncOpenAI
+            return AsyncOpenAI(api_key=api_key)
+        elif provider == "anthropic":
+            import anthropic
+            return anthropic.AsyncAnthropic(api_key=api_key)
+        raise ValueError(f"Unknown provider: {provider}")
+
+    async def _evict_idle(self):
+        now = time.monotonic()
+        for key, entry in list(self._clients.items()):
+            if entry.in_use == 0 and now - entry.last_used > self.idle_ttl:
+                self._discard(key)
+                await self._close(entry)
+
+    async def _evict_overflow(self):
+        while len(self._clients) > self.max_size:
+            key = next(iter(self._clients))
+            entry = self._discard(key)
+            if entry.in_use == 0:
+                await self._close(entry)
+
+    def _discard(self, key: Tuple[str, str, str]) -> _PooledClient:
+        entry = self._clients.pop(key)
+        entry.evicted = True
+        return entry
+
+    async def _close(self, entry: _PooledClient):
+        if entry.loop is not asyncio.get_running_loop():
+            return
+        try:
+            if entry.provider == "google":
+                await entry.client._async_client.transport.close()
+            else:
+                await entry.client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled {entry.provider} client: {e}")
+
+
+llm_client_pool = LLMClientPool(
+    max_size=int(os.getenv("LLM_CLIENT_POOL_SIZE", "32")),
+    idle_ttl=float(os.getenv("LLM_CLIENT_IDLE_TTL", "300")),
+)
@@ -0,0 +1,489 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import defaultdict, deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 408 timeout, 409 conflict, 429 rate limited, 5xx server errors and
+# Anthropic's 529 "overloaded"; every other 4xx is the caller's fault
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+_transient_types: Optional[Tuple[type, ...]] = None
+
+
+def _transient_exception_types() -> Tuple[type, ...]:
+    """Connection-level SDK errors that carry no HTTP status but are worth retrying."""
+    global _transient_types
+    if _transient_types is None:
+        types = [asyncio.TimeoutError, ConnectionError]
+        try:
+            import openai
+            types += [openai.APIConnectionError, openai.APITimeoutError]
+        except ImportError:
+            pass
+        try:
+            import anthropic
+            types += [anthropic.APIConnectionError, anthropic.APITimeoutError]
+        except ImportError:
+            pass
+        try:
+            from google.api_core import exceptions as google_exceptions
+            types += [google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded]
+        except ImportError:
+            pass
+        _transient_types = tuple(types)
+    return _transient_types
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (OpenAI/Anthropic `status_code`, Google `code`)."""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(exc, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, _transient_exception_types())
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it said so."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+    # Gemini sends a google.rpc.RetryInfo detail instead of a header
+    for detail in getattr(exc, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+
+class RetryStats:
+    """
+    Per-provider retry counters. Kept in Redis when REDIS_URL is configured so
+    the numbers include calls made by worker processes.
+    """
+
+    KEY = "llm_resilience:stats"
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def incr(self, provider: str, counter: str):
+        try:
+            redis = get_redis()
+            if redis is not None:
+                await redis.hincrby(self.KEY, f"{provider}:{counter}", 1)
+                return
+        except Exception as e:
+            logger.warning(f"Failed to record LLM {counter} for {provider}: {e}")
+        self._counters[provider][counter] += 1
+
+    async def snapshot(self) -> Dict[str, Dict[str, int]]:
+        redis = get_redis()
+        if redis is None:
+            return {provider: dict(counters) for provider, counters in self._counters.items()}
+        stats: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for field, value in (await redis.hgetall(self.KEY)).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            provider, _, counter = field.partition(":")
+            stats[provider][counter] = int(value)
+        return dict(stats)
+
+
+class LLMRetrier:
+    """
+    Retries transient provider failures (rate limits, 5xx, overloaded,
+    connection errors) with exponential backoff and full jitter.
+
+    A provider's Retry-After hint replaces the computed delay. All attempts
+    together get `deadline` seconds from the first one: each attempt is given
+    the time that is left as its timeout (a timed-out attempt is retryable),
+    and when the next wait would cross the deadline the last error is raised
+    instead, so a hung or congested provider fails a job in bounded time
+    rather than holding it indefinitely.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 20.0, deadline: float = 90.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.counters = RetryStats()
+
+    def backoff(self, retry: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    async def run(
+        self,
+        provider: str,
+        attempt: Callable[[float], Awaitable[T]],
+        can_retry: Optional[Callable[[], bool]] = None
+    ) -> T:
+        """
+        Await `attempt(timeout)` until it succeeds or fails for good; the
+        attempt must raise asyncio.TimeoutError once `timeout` seconds (what
+        is left of the deadline) have passed. `can_retry` is checked before
+        each retry; streaming calls use it to stop retrying once output has
+        been handed to the caller.
+        """
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + self.deadline
+        retries = 0
+        while True:
+            await self.counters.incr(provider, "attempts")
+            try:
+                result = await attempt(max(0.0, give_up_at - loop.time()))
+            except Exception as e:
+                if not is_retryable(e) or (can_retry is not None and not can_retry()):
+                    raise
+                hint = retry_after(e)
+                delay = hint if hint is not None else self.backoff(retries)
+                retries += 1
+                if retries >= self.max_attempts or loop.time() + delay > give_up_at:
+                    await self.counters.incr(provider, "give_ups")
+                    logger.warning(f"Giving up on {provider} after {retries} attempt(s): {e}")
+                    raise
+                await self.counters.incr(provider, "retries")
+                logger.warning(
+                    f"{provider} call failed ({status_code(e) or type(e).__name__}), "
+                    f"retry {retries} in {delay:.1f}s{' (Retry-After)' if hint is not None else ''}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            if retries:
+                await self.counters.incr(provider, "recovered")
+            return result
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "deadline_seconds": self.deadline,
+            "providers": await self.counters.snapshot(),
+        }
+
+
+class CircuitBreaker:
+    """
+    Tracks the recent calls to one (provider, model) and stops sending it
+    traffic while it is failing.
+
+    closed: calls pass; the breaker opens when, over the last `window` calls
+    (at least `min_calls`), the share of provider-side failures or of calls
+    slower than `slow_call_seconds` reaches `failure_threshold`.
+    open: calls are refused for `cooldown` seconds.
+    half_open: a single probe call is let through; its success closes the
+    breaker, its failure opens it for another cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_threshold: float = 0.5,
+        slow_call_seconds: float = 60.0,
+        cooldown: float = 30.0
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        # (failed, slow) per call, most recent last
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (claims the probe when half-open)."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self.probing = False
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    @property
+    def available(self) -> bool:
+        """Whether further calls (such as retries) are worth making, without claiming a probe."""
+        return self.state == self.CLOSED
+
+    def record(self, failed: bool, elapsed: float):
+        slow = elapsed >= self.slow_call_seconds
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+            if failed or slow:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self._calls.clear()
+            return
+        self._calls.append((failed, slow))
+        if self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+            failures = sum(1 for failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, slow in self._calls if slow)
+            if max(failures, slow_calls) >= self.failure_threshold * len(self._calls):
+                self._open()
+
+    def release(self):
+        """Give back a probe claimed by allow() that ended without a verdict."""
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "recent_calls": len(self._calls),
+            "recent_failures": sum(1 for failed, _ in self._calls if failed),
+        }
+
+
+class CircuitBreakers:
+    """
+    One CircuitBreaker per (provider, model), created on first use. State is
+    per process: every API/worker process detects an outage from its own calls.
+    """
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get((provider, model))
+        if breaker is None:
+            breaker = self._breakers[(provider, model)] = CircuitBreaker(**self.settings)
+        return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{provider}/{model}": breaker.stats() for (provider, model), breaker in self._breakers.items()}
+
+
+llm_retrier = LLMRetrier(
+    max_attempts=int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "4")),
+    base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0")),
+    max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "20")),
+    deadline=float(os.getenv("LLM_RETRY_DEADLINE", "90")),
+)
+
+circuit_breakers = CircuitBreakers(
+    window=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+    min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+    failure_threshold=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "60")),
+    cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+)
+
+
+class LatencyTracker:
+    """Latencies of the most recent successful calls to one (provider, model)."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, elapsed: float):
+        self._samples.append(elapsed)
+
+    def percentile(self, p: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class RequestClock:
+    """
+    When the current attempt of one call started its provider request.
+
+    Started once the attempt holds its scheduler slot and stopped when the
+    attempt ends, so neither queue wait nor retry back-off counts as
+    provider latency (as for CircuitBreaker).
+    """
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        # Duration of the last finished attempt
+        self.elapsed: Optional[float] = None
+        self.changed = asyncio.Event()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.changed.set()
+
+    def stop(self):
+        if self.started_at is not None:
+            self.elapsed = time.monotonic() - self.started_at
+            self.started_at = None
+            self.changed.set()
+
+
+class Hedger:
+    """
+    Hedged requests: when a provider request has been running longer than
+    the `percentile` of recent latencies for its (provider, model), a second
+    request is started and whichever returns a valid result first wins; the
+    other is cancelled. Until `min_samples` latencies are known nothing is
+    hedged.
+
+    Latencies and the hedge timer count from when the request got its
+    concurrency slot (see RequestClock): a call still queued for a slot or
+    backing off between retries is never hedged, since a backup would only
+    add load to the provider that is already saturated.
+
+    Every hedge is a paid extra request, so at most `max_in_flight` may be
+    outstanding per process; beyond that slow calls are simply awaited.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, max_in_flight: int = 4, min_samples: int = 20):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_in_flight = max_in_flight
+        self.min_samples = min_samples
+        self.in_flight = 0
+        self._latencies: Dict[Tuple[str, str], LatencyTracker] = defaultdict(LatencyTracker)
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    def hedge_delay(self, provider: str, model: str) -> Optional[float]:
+        return self._latencies[(provider, model)].percentile(self.percentile, self.min_samples)
+
+    async def _timed(self, provider: str, model: str, call: Callable[[], Awaitable[T]], clock: RequestClock) -> T:
+        result = await call()
+        if clock.elapsed is not None:
+            self._latencies[(provider, model)].record(clock.elapsed)
+        return result
+
+    @staticmethod
+    async def _wait_until_slow(task: "asyncio.Future", clock: RequestClock, delay: float) -> bool:
+        """True once the request in flight has run `delay` seconds, False if `task` finished first."""
+        while not task.done():
+            clock.changed.clear()
+            timeout = None
+            if clock.started_at is not None:
+                timeout = clock.started_at + delay - time.monotonic()
+                if timeout <= 0:
+                    return True
+            # Otherwise wait for the attempt to start (or end, before a retry)
+            changed = asyncio.ensure_future(clock.changed.wait())
+            try:
+                await asyncio.wait([task, changed], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed.cancel()
+        return False
+
+    async def run(
+        self,
+        primary: Tuple[str, str, Callable[[], Awaitable[T]], RequestClock],
+        hedge: Callable[[], Optional[Tuple[str, str, Callable[[], Awaitable[T]], RequestClock]]]
+    ) -> T:
+        """
+        Run `primary` = (provider, model, call, clock), where the call starts
+        and stops `clock` around each provider request. `hedge()` is asked
+        for the backup (provider, model, call, clock) once the primary is
+        slow; it returns None when no backup may be sent (e.g. its circuit
+        is open).
+        """
+        provider, model, call, clock = primary
+        primary_task = asyncio.ensure_future(self._timed(provider, model, call, clock))
+        tasks = [primary_task]
+        try:
+            delay = self.hedge_delay(provider, model)
+            if delay is None or not await self._wait_until_slow(primary_task, clock, delay):
+                return await primary_task
+            if self.in_flight >= self.max_in_flight:
+                self._counters["skipped_budget"] += 1
+                return await primary_task
+            backup = hedge()
+            if backup is None:
+                return await primary_task
+
+            hedge_provider, hedge_model, hedge_call, hedge_clock = backup
+            self.in_flight += 1
+            self._counters["hedged"] += 1
+            logger.info(f"{provider}/{model} slower than p{self.percentile:g} ({delay:.1f}s), hedging with {hedge_provider}/{hedge_model}")
+            try:
+                tasks.append(asyncio.ensure_future(self._timed(hedge_provider, hedge_model, hedge_call, hedge_clock)))
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            self._counters["hedge_wins" if task is not primary_task else "primary_wins"] += 1
+                            return task.result()
+                # Both failed: report the primary's error
+                self._counters["both_failed"] += 1
+                raise primary_task.exception()
+            finally:
+                self.in_flight -= 1
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        hedged = self._counters["hedged"]
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            **self._counters,
+            "hedge_win_rate": round(self._counters["hedge_wins"] / hedged, 3) if hedged else None,
+            "delays": {
+                f"{provider}/{model}": self.hedge_delay(provider, model)
+                for provider, model in list(self._latencies)
+            },
+        }
+
+
+hedger = Hedger(
+    enabled=os.getenv("LLM_HEDGING", "false").lower() == "true",
+    percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+    max_in_flight=int(os.getenv("LLM_HEDGE_MAX_IN_FLIGHT", "4")),
+    min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+)
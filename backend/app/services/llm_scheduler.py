@@ -0,0 +1,263 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.redis import get_redis
+from app.models import CreditTransaction
+from app.services.llm_clients import hash_api_key
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_PAID = "paid"
+PRIORITY_STANDARD = "standard"
+
+# (user_id, priority) of the job making LLM calls; set by the job handlers
+_tenant: ContextVar[Tuple[Optional[int], str]] = ContextVar("llm_tenant", default=(None, PRIORITY_STANDARD))
+
+
+def priority_for_user(db: Session, user_id: int) -> str:
+    """Users who have bought credits get their LLM calls scheduled first."""
+    paid = db.query(CreditTransaction.id).filter(
+        CreditTransaction.user_id == user_id,
+        CreditTransaction.stripe_payment_id.isnot(None)
+    ).first()
+    return PRIORITY_PAID if paid else PRIORITY_STANDARD
+
+
+class _Lane:
+    """Concurrency slots and waiting calls for one (provider, API key)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.loop = asyncio.get_running_loop()
+        self.in_flight = 0
+        self.paid_streak = 0
+        # priority -> user -> waiting futures; users are served round-robin
+        self.waiting: Dict[str, "OrderedDict[Any, Deque[asyncio.Future]]"] = {
+            PRIORITY_PAID: OrderedDict(),
+            PRIORITY_STANDARD: OrderedDict(),
+        }
+        self.granted = 0
+        self.queued_calls = 0
+        self.shared_wait = 0.0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=200)
+
+    def queued(self) -> int:
+        return sum(
+            1 for users in self.waiting.values() for futures in users.values() for future in futures if not future.done()
+        )
+
+
+class LLMScheduler:
+    """
+    Admission control in front of provider calls.
+
+    Each (provider, API key) gets at most `capacity` calls in flight, so one
+    busy tenant cannot exhaust a shared key's rate limit. Calls beyond that
+    wait in per-user queues served round-robin, so a user with several
+    concurrent jobs in this process takes turns with everyone else. Paying
+    users are served before standard ones, but every `paid_share` paid grants
+    a waiting standard call goes next so nobody starves.
+
+    With Redis (and `shared`), the cap holds across all API and worker
+    processes: a call that got a local slot also takes one of `capacity`
+    leased slots in a Redis sorted set per (provider, key), waiting while
+    other processes hold them all. Leases expire after `lease_seconds`, so a
+    crashed process cannot hold slots forever. Which user's job runs next
+    across processes is decided when workers claim jobs (see JobQueue).
+    """
+
+    def __init__(
+        self,
+        capacities: Dict[str, int],
+        default_capacity: int = 8,
+        paid_share: int = 3,
+        shared: bool = True,
+        lease_seconds: float = 300.0
+    ):
+        self.capacities = capacities
+        self.default_capacity = default_capacity
+        self.paid_share = paid_share
+        self.shared = shared
+        self.lease_seconds = lease_seconds
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+
+    @contextmanager
+    def tenant(self, user_id: Optional[int], priority: Optional[str]):
+        """Attribute the LLM calls made inside this block (and tasks it starts) to a user."""
+        token = _tenant.set((user_id, priority or PRIORITY_STANDARD))
+        try:
+            yield
+        finally:
+            _tenant.reset(token)
+
+    def _lane(self, provider: str, api_key: str) -> _Lane:
+        key = (provider, hash_api_key(api_key))
+        lane = self._lanes.get(key)
+        if lane is None or lane.loop is not asyncio.get_running_loop():
+            # Futures are bound to the loop they were created on
+            lane = self._lanes[key] = _Lane(self.capacities.get(provider, self.default_capacity))
+        return lane
+
+    def has_capacity(self, provider: str, api_key: str) -> bool:
+        """Whether a call to this (provider, key) would get a slot in this process without queueing."""
+        lane = self._lane(provider, api_key)
+        return lane.in_flight < lane.capacity and not lane.queued()
+
+    @asynccontextmanager
+    async def slot(self, provider: str, api_key: str):
+        """Hold one of the (provider, key) concurrency slots for a provider call."""
+        lane = self._lane(provider, api_key)
+        await self._acquire(lane)
+        try:
+            shared_key = f"llm:slots:{provider}:{hash_api_key(api_key)}"
+            token = await self._acquire_shared(lane, shared_key)
+            try:
+                yield
+            finally:
+                if token is not None:
+                    await self._release_shared(shared_key, token)
+        finally:
+            lane.in_flight -= 1
+            self._grant(lane)
+
+    async def _acquire_shared(self, lane: _Lane, key: str) -> Optional[str]:
+        """Lease one of the cross-process slots; None when Redis is not used (or fails)."""
+        redis = get_redis() if self.shared else None
+        if redis is None:
+            return None
+        from redis.exceptions import RedisError, WatchError
+
+        token = uuid.uuid4().hex
+        started = time.monotonic()
+        delay = 0.05
+        while True:
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    await pipe.watch(key)
+                    now = time.time()
+                    if await pipe.zcount(key, now, "+inf") < lane.capacity:
+                        pipe.multi()
+                        pipe.zremrangebyscore(key, "-inf", now)
+                        pipe.zadd(key, {token: now + self.lease_seconds})
+                        pipe.expire(key, int(self.lease_seconds) + 1)
+                        await pipe.execute()
+                        lane.shared_wait += time.monotonic() - started
+                        return token
+                    await pipe.unwatch()
+            except WatchError:
+                # Another process took or freed a slot meanwhile; look again
+                continue
+            except RedisError as e:
+                # Fall back to the per-process limit rather than failing the call
+                logger.warning(f"Shared LLM slot unavailable ({e}), using the local limit only")
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _release_shared(self, key: str, token: str):
+        from redis.exceptions import RedisError
+
+        try:
+            await get_redis().zrem(key, token)
+        except RedisError as e:
+            # The lease expires on its own
+            logger.warning(f"Could not release shared LLM slot: {e}")
+
+    async def _acquire(self, lane: _Lane):
+        user_id, priority = _tenant.get()
+        started = time.monotonic()
+        if lane.in_flight < lane.capacity and not lane.queued():
+            lane.in_flight += 1
+            self._record_wait(lane, 0.0)
+            return
+
+        future = lane.loop.create_future()
+        lane.waiting[priority].setdefault(user_id, deque()).append(future)
+        lane.queued_calls += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away: pass the slot on
+                lane.in_flight -= 1
+                self._grant(lane)
+            raise
+        self._record_wait(lane, time.monotonic() - started)
+
+    def _grant(self, lane: _Lane):
+        while lane.in_flight < lane.capacity:
+            future = self._next_waiter(lane)
+            if future is None:
+                return
+            if future.done():
+                # Cancelled while queued
+                continue
+            lane.in_flight += 1
+            future.set_result(None)
+
+    def _next_waiter(self, lane: _Lane) -> Optional[asyncio.Future]:
+        paid, standard = lane.waiting[PRIORITY_PAID], lane.waiting[PRIORITY_STANDARD]
+        if paid and (not standard or lane.paid_streak < self.paid_share):
+            users = paid
+            lane.paid_streak = lane.paid_streak + 1 if standard else 0
+        elif standard:
+            users = standard
+            lane.paid_streak = 0
+        else:
+            return None
+        user_id, futures = next(iter(users.items()))
+        future = futures.popleft()
+        # Round-robin: this user goes to the back of the line
+        del users[user_id]
+        if futures:
+            users[user_id] = futures
+        return future
+
+    def _record_wait(self, lane: _Lane, waited: float):
+        lane.granted += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        lane.recent_waits.append(waited)
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for (provider, key_hash), lane in self._lanes.items():
+            waits = sorted(lane.recent_waits)
+            lanes[f"{provider}:{key_hash[:8]}"] = {
+                "capacity": lane.capacity,
+                "in_flight": lane.in_flight,
+                "queued": lane.queued(),
+                "granted": lane.granted,
+                "queued_calls": lane.queued_calls,
+                "avg_wait_seconds": round(lane.total_wait / lane.granted, 3) if lane.granted else None,
+                "p95_wait_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                "max_wait_seconds": round(lane.max_wait, 3),
+                "shared_wait_seconds": round(lane.shared_wait, 3),
+            }
+        return {"paid_share": self.paid_share, "shared": self.shared and get_redis() is not None, "lanes": lanes}
+
+
+llm_scheduler = LLMScheduler(
+    # LLM_CONCURRENCY_GOOGLE / _OPENAI / _ANTHROPIC override LLM_CONCURRENCY
+    capacities={
+        provider: int(os.getenv(f"LLM_CONCURRENCY_{provider.upper()}"))
+        for provider in ("google", "openai", "anthropic")
+        if os.getenv(f"LLM_CONCURRENCY_{provider.upper()}")
+    },
+    default_capacity=int(os.getenv("LLM_CONCURRENCY", "8")),
+    paid_share=int(os.getenv("LLM_PAID_SHARE", "3")),
+    # With Redis the caps are global across processes (LLM_SHARED_CONCURRENCY=false: per process)
+    shared=os.getenv("LLM_SHARED_CONCURRENCY", "true").lower() == "true",
+    lease_seconds=float(os.getenv("LLM_SLOT_LEASE_SECONDS", "300")),
+)
@@ -0,0 +1,100 @@
+"""
+Unicode TrueType fonts for generated PDFs.
+
+The core PDF fonts (Helvetica) only cover latin-1, so names and text in
+Turkish, Cyrillic, Greek etc. cannot be rendered with them. When a TTF
+family is installed it is embedded instead; fpdf2 subsets it to the glyphs
+a document uses, so output stays small. Point PDF_FONT_PATH (and the bold /
+italic variants) at e.g. a Noto CJK font for scripts DejaVu does not cover.
+
+Parsing a TTF (cmap, glyph widths) takes far longer than rendering a
+resume, so each font file is parsed once per process and every PDF gets a
+cheap copy of the parsed font with its own subset state.
+"""
+import io
+import os
+import copy
+import logging
+import threading
+import functools
+from typing import Dict, Optional, Tuple
+
+from fpdf import FPDF
+from fpdf.enums import TextEmphasis
+from fpdf.fonts import SubsetMap, TTFFont
+from fontTools import ttLib
+
+logger = logging.getLogger(__name__)
+
+UNICODE_FONT_FAMILY = "ResumeSans"
+PDF_FONT_PATH = os.getenv("PDF_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+PDF_FONT_BOLD_PATH = os.getenv("PDF_FONT_BOLD_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+PDF_FONT_ITALIC_PATH = os.getenv("PDF_FONT_ITALIC_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Oblique.ttf")
+
+# path -> (parsed font, raw file bytes)
+_parsed_fonts: Dict[str, Tuple[TTFFont, bytes]] = {}
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _font_files() -> Optional[Dict[str, str]]:
+    """Font file per style, or None without a regular face. Missing bold /
+    italic faces fall back to the regular one."""
+    if not os.path.isfile(PDF_FONT_PATH):
+        return None
+    return {
+        "": PDF_FONT_PATH,
+        "B": PDF_FONT_BOLD_PATH if os.path.isfile(PDF_FONT_BOLD_PATH) else PDF_FONT_PATH,
+        "I": PDF_FONT_ITALIC_PATH if os.path.isfile(PDF_FONT_ITALIC_PATH) else PDF_FONT_PATH,
+    }
+
+
+def unicode_font_available() -> bool:
+    return _font_files() is not None
+
+
+def _parsed(path: str) -> Tuple[TTFFont, bytes]:
+    with _lock:
+        if path not in _parsed_fonts:
+            scratch = FPDF()
+            scratch.add_font(UNICODE_FONT_FAMILY, "", path)
+            with open(path, "rb") as f:
+                _parsed_fonts[path] = (scratch.fonts[UNICODE_FONT_FAMILY.lower()], f.read())
+        return _parsed_fonts[path]
+
+
+def _add_font(pdf: FPDF, style: str, path: str):
+    parsed, data = _parsed(path)
+    fontkey = f"{UNICODE_FONT_FAMILY.lower()}{style}"
+    font = copy.copy(parsed)
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = fontkey
+    font.emphasis = TextEmphasis.coerce(style)
+    # PDF objects get a per-document object id when written
+    font.desc = copy.copy(parsed.desc)
+    # Output subsets `ttfont` in place, so every document needs its own
+    # (loaded lazily from the cached bytes). Metrics and cmap are shared.
+    font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+    font._hbfont = None
+    font.biggest_size_pt = 0
+    font.missing_glyphs = []
+    font.subset = SubsetMap(font)
+    pdf.fonts[fontkey] = font
+
+
+def add_unicode_fonts(pdf: FPDF) -> Optional[str]:
+    """
+    Registers the Unicode family (regular, bold, italic) on `pdf` and returns
+    its name, or None if no font is installed.
+    """
+    files = _font_files()
+    if files is None:
+        return None
+    for style, path in files.items():
+        try:
+            _add_font(pdf, style, path)
+        except (AttributeError, TypeError) as e:
+            # Font internals differ in this fpdf2 version; parse per document
+            logger.warning(f"Shared font cache unavailable ({e}), loading {path} directly")
+            pdf.add_font(UNICODE_FONT_FAMILY, style, path)
+    return UNICODE_FONT_FAMILY
@@ -1,9 +1,72 @@
 from fpdf import FPDF
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
 import os
 import io
+import tempfile
+import re
+import json
+import hashlib
+import unicodedata
+from functools import lru_cache
 from typing import Dict, Any, List
 
+from app.services.pdf_fonts import add_unicode_fonts, unicode_font_available
+
+# Bump whenever generated output changes (layout, fonts, themes) so cached
+# renders of unchanged content are regenerated.
+GENERATOR_VERSION = "4"
+
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume-platform-jinja"))
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
+
+# Unicode punctuation LLMs commonly emit, mapped to characters the core PDF
+# fonts (latin-1) can encode. Applied by _clean_text().
+_CLEAN_TEXT_REPLACEMENTS = {
+    # Bullets and list markers
+    "\u2022": "-", "\u2023": "-", "\u2043": "-", "\u2219": "-", "\u25aa": "-",
+    "\u25ab": "-", "\u25a0": "-", "\u25a1": "-", "\u25cf": "-", "\u25e6": "-",
+    "\u25b6": "-", "\u25ba": "-", "\u27a2": "-", "\u27a4": "-", "\u2713": "-",
+    "\u2714": "-",
+    # Arrows
+    "\u2192": "->", "\u2190": "<-", "\u2194": "<->", "\u21d2": "=>", "\u279c": "->",
+    # Hyphens and dashes
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-",
+    "\u2015": "-", "\u2212": "-",
+    # Quotes and primes
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u2033": '"',
+    # Ellipsis and symbols
+    "\u2026": "...", "\u2122": "(TM)", "\u20ac": "EUR",
+    # Typographic spaces
+    "\u2002": " ", "\u2003": " ", "\u2004": " ", "\u2005": " ", "\u2006": " ",
+    "\u2007": " ", "\u2008": " ", "\u2009": " ", "\u200a": " ", "\u202f": " ",
+    "\u205f": " ", "\u3000": " ",
+    # Invisible characters
+    "\u200b": "", "\u200c": "", "\u200d": "", "\u2060": "", "\ufeff": "",
+}
+_CLEAN_TEXT_PATTERN = re.compile("[" + "".join(_CLEAN_TEXT_REPLACEMENTS) + "]")
+_NON_LATIN1_PATTERN = re.compile("[^\x00-\xff]")
+
+
+@lru_cache(maxsize=4096)
+def _latin1_char(char: str) -> str:
+    return unicodedata.normalize("NFKD", char).encode("latin-1", "ignore").decode("latin-1") or "?"
+
+
+def _to_latin1(text: str) -> str:
+    """Strips accents from characters outside latin-1 (\u011f -> g), else uses '?'."""
+    try:
+        text.encode("latin-1")
+        return text
+    except UnicodeEncodeError:
+        pass
+    # As in _clean_text: replace each distinct offending character in C,
+    # decomposing it only once per process
+    for char in set(_NON_LATIN1_PATTERN.findall(text)):
+        text = text.replace(char, _latin1_char(char))
+    return text
+
 
 class ResumePDF(FPDF):
     """Custom PDF class for resume generation with professional layout."""
@@ -22,8 +85,17 @@ class ResumePDF(FPDF):
 class PDFGenerator:
     def __init__(self):
         self.template_dir = os.path.join(os.path.dirname(__file__), "../templates")
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        # Templates only change with a deploy: compile once per process (no
+        # mtime checks) and keep compiled bytecode on disk for new workers
+        self.env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+            bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+        )
         self.available_templates = ["professional", "modern", "classic", "minimal"]
+        # Without a Unicode font, text is reduced to latin-1 by _clean_text()
+        self.unicode_font = unicode_font_available()
 
     def get_available_templates(self) -> List[str]:
         """Returns list of available template names."""
@@ -105,35 +177,50 @@ class PDFGenerator:
         
         return normalized
 
+    def content_hash(self, resume_data: dict) -> str:
+        """SHA-256 of the normalized resume data, stable across key order."""
+        normalized = self._normalize_resume_data(resume_data)
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _needs_unicode(self, data: dict) -> bool:
+        """True when the (normalized) resume data has text outside latin-1."""
+        try:
+            json.dumps(data, ensure_ascii=False, default=str).encode("latin-1")
+            return False
+        except UnicodeEncodeError:
+            return True
+
     def _clean_text(self, text: str) -> str:
         """Clean text for PDF rendering - handle unicode characters."""
         if not text:
             return ""
-        # Replace unicode bullet points
         text = str(text)
-        text = text.replace("•", "-")
-        text = text.replace("▪", "-")
-        text = text.replace("→", "->")
-        text = text.replace("–", "-")
-        text = text.replace("—", "-")
-        text = text.replace(""", '"')
-        text = text.replace(""", '"')
-        text = text.replace("'", "'")
-        text = text.replace("'", "'")
-        return text
+        if text.isascii() or self.unicode_font:
+            return text
+        # Find which mapped characters occur in one regex scan, then replace
+        # only those (str.replace runs in C; a per-character str.translate
+        # table is several times slower on typical bullets)
+        for char in set(_CLEAN_TEXT_PATTERN.findall(text)):
+            text = text.replace(char, _CLEAN_TEXT_REPLACEMENTS[char])
+        return _to_latin1(text)
 
     def generate_professional(self, data: dict) -> bytes:
         """Generate PDF using professional template matching the user's design."""
         pdf = FPDF()
+        # Core Helvetica covers latin-1; embedding (and subsetting) the Unicode
+        # font makes a render ~8x slower and ~16x larger, so only pay for it
+        # when some text needs it. Without the font, _clean_text reduces text
+        # to latin-1.
+        font = (self._needs_unicode(data) and add_unicode_fonts(pdf)) or "Helvetica"
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)
         
-        # Use built-in fonts
         personal_info = data.get("personal_info", {})
         name = self._clean_text(personal_info.get("name", "Your Name"))
         
         # HEADER - Name (large, bold)
-        pdf.set_font("Helvetica", "B", 28)
+        pdf.set_font(font, "B", 28)
         pdf.set_text_color(0, 0, 0)
         pdf.cell(0, 12, name, ln=True)
         
@@ -151,7 +238,7 @@ class PDFGenerator:
             contact_parts.append(personal_info["location"])
         
         if contact_parts:
-            pdf.set_font("Helvetica", "", 9)
+            pdf.set_font(font, "", 9)
             pdf.set_text_color(100, 100, 100)
             contact_text = " | ".join(contact_parts)
             pdf.cell(0, 5, self._clean_text(contact_text), ln=True)
@@ -159,7 +246,7 @@ class PDFGenerator:
         # SUMMARY
         summary = data.get("summary", "")
         if summary:
-            pdf.set_font("Helvetica", "I", 10)
+            pdf.set_font(font, "I", 10)
             pdf.set_text_color(60, 60, 60)
             pdf.ln(3)
             pdf.multi_cell(0, 5, self._clean_text(summary))
@@ -169,14 +256,14 @@ class PDFGenerator:
         # EDUCATION Section
         education = data.get("education", [])
         if education:
-            self._add_section_header(pdf, "EDUCATION")
+            self._add_section_header(pdf, "EDUCATION", font)
             for edu in education:
                 school = self._clean_text(edu.get("school") or edu.get("institution", ""))
                 degree = self._clean_text(edu.get("degree", ""))
                 dates = self._clean_text(edu.get("dates", ""))
                 
                 # Title with degree and school
-                pdf.set_font("Helvetica", "B", 11)
+                pdf.set_font(font, "B", 11)
                 pdf.set_text_color(0, 0, 0)
                 
                 title_text = f"{school}"
@@ -192,7 +279,7 @@ class PDFGenerator:
                 pdf.cell(title_width, 6, title_text[:80], ln=False)
                 
                 # Date (right-aligned)
-                pdf.set_font("Helvetica", "I", 10)
+                pdf.set_font(font, "I", 10)
                 pdf.set_text_color(80, 80, 80)
                 pdf.cell(date_width, 6, dates, ln=True, align="R")
                 
@@ -201,14 +288,14 @@ class PDFGenerator:
                 if details:
                     for detail in details:
                         if detail:
-                            self._add_bullet(pdf, self._clean_text(detail))
+                            self._add_bullet(pdf, self._clean_text(detail), font)
                 
                 pdf.ln(2)
         
         # EXPERIENCE Section
         experience = data.get("experience", [])
         if experience:
-            self._add_section_header(pdf, "EXPERIENCE")
+            self._add_section_header(pdf, "EXPERIENCE", font)
             for exp in experience:
                 title = self._clean_text(exp.get("title") or exp.get("position", ""))
                 company = self._clean_text(exp.get("company", ""))
@@ -216,7 +303,7 @@ class PDFGenerator:
                 subtitle = self._clean_text(exp.get("subtitle", ""))
                 
                 # Title line (bold title - company)
-                pdf.set_font("Helvetica", "B", 11)
+                pdf.set_font(font, "B", 11)
                 pdf.set_text_color(0, 0, 0)
                 
                 title_text = title
@@ -231,13 +318,13 @@ class PDFGenerator:
                 pdf.cell(title_width, 6, title_text[:70], ln=False)
                 
                 # Date (right-aligned, italic)
-                pdf.set_font("Helvetica", "I", 10)
+                pdf.set_font(font, "I", 10)
                 pdf.set_text_color(80, 80, 80)
                 pdf.cell(date_width, 6, dates, ln=True, align="R")
                 
                 # Subtitle if present
                 if subtitle:
-                    pdf.set_font("Helvetica", "I", 10)
+                    pdf.set_font(font, "I", 10)
                     pdf.set_text_color(60, 60, 60)
                     pdf.cell(0, 5, subtitle, ln=True)
                 
@@ -245,12 +332,12 @@ class PDFGenerator:
                 bullets = exp.get("bullets", exp.get("details", []))
                 for bullet in bullets:
                     if bullet:
-                        self._add_bullet(pdf, self._clean_text(bullet))
+                        self._add_bullet(pdf, self._clean_text(bullet), font)
                 
                 # Website/Product link
                 website = exp.get("website") or exp.get("product") or exp.get("link")
                 if website:
-                    pdf.set_font("Helvetica", "", 9)
+                    pdf.set_font(font, "", 9)
                     pdf.set_text_color(100, 100, 100)
                     pdf.set_x(pdf.l_margin + 5)
                     pdf.cell(0, 5, f"Website: {website}", ln=True)
@@ -260,8 +347,8 @@ class PDFGenerator:
         # TECHNOLOGY / SKILLS Section
         skills = data.get("skills", [])
         if skills:
-            self._add_section_header(pdf, "TECHNOLOGY")
-            pdf.set_font("Helvetica", "", 10)
+            self._add_section_header(pdf, "TECHNOLOGY", font)
+            pdf.set_font(font, "", 10)
             pdf.set_text_color(40, 40, 40)
             skills_text = ", ".join([self._clean_text(s) for s in skills])
             pdf.multi_cell(0, 5, skills_text)
@@ -270,13 +357,13 @@ class PDFGenerator:
         # PROJECTS Section
         projects = data.get("projects", [])
         if projects:
-            self._add_section_header(pdf, "PROJECTS")
+            self._add_section_header(pdf, "PROJECTS", font)
             for project in projects:
                 name = self._clean_text(project.get("name", ""))
                 description = self._clean_text(project.get("description", ""))
                 dates = self._clean_text(project.get("dates", ""))
                 
-                pdf.set_font("Helvetica", "B", 11)
+                pdf.set_font(font, "B", 11)
                 pdf.set_text_color(0, 0, 0)
                 
                 # Calculate width for title and date
@@ -287,31 +374,31 @@ class PDFGenerator:
                 pdf.cell(title_width, 6, name[:60], ln=False)
                 
                 # Date (right-aligned)
-                pdf.set_font("Helvetica", "I", 10)
+                pdf.set_font(font, "I", 10)
                 pdf.set_text_color(80, 80, 80)
                 pdf.cell(date_width, 6, dates, ln=True, align="R")
                 
                 # Description
                 if description:
-                    self._add_bullet(pdf, description)
+                    self._add_bullet(pdf, description, font)
                 
                 pdf.ln(2)
         
         # PROGRAMS Section
         programs = data.get("programs", data.get("certifications", []))
         if programs:
-            self._add_section_header(pdf, "PROGRAMS")
+            self._add_section_header(pdf, "PROGRAMS", font)
             for program in programs:
                 if isinstance(program, str):
-                    pdf.set_font("Helvetica", "", 10)
+                    pdf.set_font(font, "", 10)
                     pdf.set_text_color(40, 40, 40)
-                    self._add_bullet(pdf, self._clean_text(program))
+                    self._add_bullet(pdf, self._clean_text(program), font)
                 elif isinstance(program, dict):
                     name = self._clean_text(program.get("name", ""))
                     dates = self._clean_text(program.get("dates", ""))
                     description = self._clean_text(program.get("description", ""))
                     
-                    pdf.set_font("Helvetica", "B", 11)
+                    pdf.set_font(font, "B", 11)
                     pdf.set_text_color(0, 0, 0)
                     
                     page_width = pdf.w - pdf.l_margin - pdf.r_margin
@@ -320,27 +407,27 @@ class PDFGenerator:
                     
                     pdf.cell(title_width, 6, name[:60], ln=False)
                     
-                    pdf.set_font("Helvetica", "I", 10)
+                    pdf.set_font(font, "I", 10)
                     pdf.set_text_color(80, 80, 80)
                     pdf.cell(date_width, 6, dates, ln=True, align="R")
                     
                     if description:
-                        self._add_bullet(pdf, description)
+                        self._add_bullet(pdf, description, font)
             pdf.ln(2)
         
         return pdf.output()
 
-    def _add_section_header(self, pdf: FPDF, title: str):
+    def _add_section_header(self, pdf: FPDF, title: str, font: str = "Helvetica"):
         """Add a section header with gray background."""
-        pdf.set_font("Helvetica", "B", 12)
+        pdf.set_font(font, "B", 12)
         pdf.set_text_color(0, 0, 0)
         pdf.set_fill_color(230, 230, 240)  # Light blue-gray background
         pdf.cell(0, 7, title, ln=True, fill=True)
         pdf.ln(2)
     
-    def _add_bullet(self, pdf: FPDF, text: str):
+    def _add_bullet(self, pdf: FPDF, text: str, font: str = "Helvetica"):
         """Add a bullet point item."""
-        pdf.set_font("Helvetica", "", 10)
+        pdf.set_font(font, "", 10)
         pdf.set_text_color(40, 40, 40)
         pdf.set_x(pdf.l_margin + 5)
         # Use dash as bullet
@@ -359,9 +446,12 @@ class PDFGenerator:
         template = self.env.get_template(f"themes/{theme}.html")
         return template.render(**normalized_data)
 
-    def generate(self, resume_data: dict, theme: str = "professional") -> bytes:
+    def generate(self, resume_data: dict, theme: str = "professional", raise_errors: bool = False) -> bytes:
         """
         Generates PDF bytes from data using the specified theme.
+        
+        On failure returns a PDF describing the error, unless `raise_errors`
+        is set (used when the output is going to be cached).
         """
         try:
             # Normalize data
@@ -375,6 +465,8 @@ class PDFGenerator:
                 return self.generate_professional(normalized_data)
                 
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"PDF Generation Failed: {e}")
             import traceback
             traceback.print_exc()
@@ -390,14 +482,16 @@ class PDFGenerator:
         pdf.cell(0, 20, "Resume Generation Error", ln=True, align="C")
         pdf.set_font("Helvetica", "", 12)
         pdf.set_text_color(80, 80, 80)
-        pdf.multi_cell(0, 8, f"Error: {error_message[:200]}")
+        pdf.multi_cell(0, 8, _to_latin1(f"Error: {error_message[:200]}"))
         pdf.ln(10)
         pdf.cell(0, 10, "Please try again or contact support.", ln=True, align="C")
         return pdf.output()
 
-    def generate_docx(self, resume_data: dict) -> bytes:
+    def generate_docx(self, resume_data: dict, raise_errors: bool = False) -> bytes:
         """
         Generates DOCX bytes from resume data.
+        
+        Falls back to a placeholder DOCX on failure unless `raise_errors` is set.
         """
         try:
             from docx import Document
@@ -521,9 +615,13 @@ class PDFGenerator:
             return buffer.getvalue()
             
         except ImportError:
+            if raise_errors:
+                raise
             print("python-docx not installed. Falling back to dummy DOCX.")
             return self._get_dummy_docx()
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"DOCX Generation Failed: {e}")
             import traceback
             traceback.print_exc()
@@ -535,3 +633,19 @@ class PDFGenerator:
         return b"PK\x03\x04\x14\x00\x00\x00\x00\x00"  # Minimal zip header
 
 pdf_generator = PDFGenerator()
+
+
+def render_format(resume_data: dict, fmt: str, theme: str = "professional", raise_errors: bool = False) -> bytes:
+    """Renders one output format; module-level so it can run in a worker process."""
+    if fmt == "pdf":
+        return pdf_generator.generate(resume_data, theme=theme, raise_errors=raise_errors)
+    if fmt == "docx":
+        return pdf_generator.generate_docx(resume_data, raise_errors=raise_errors)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def render_error(fmt: str, error_message: str) -> bytes:
+    """The document served in place of a failed render."""
+    if fmt == "pdf":
+        return pdf_generator._generate_error_pdf(error_message)
+    return pdf_generator._get_dummy_docx()
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.storage import storage
+from app.db.session import session_scope
+from app.models import Resume, ResumeStatus, ResumeText
+from app.utils.text_extractor import extract_document
+
+logger = logging.getLogger(__name__)
+
+MIN_TEXT_CHARS = 50
+INSUFFICIENT_TEXT_ERROR = "Could not extract sufficient text from the resume. Please upload a valid PDF or DOCX file."
+
+
+def has_sufficient_text(text: str) -> bool:
+    return bool(text) and len(text.strip()) >= MIN_TEXT_CHARS
+
+
+async def get_resume_text(resume_id: int, record_failure: bool = False) -> str:
+    """
+    Returns the extracted text of a resume's original upload.
+
+    Text is extracted once per upload and stored in `resume_texts`; analysis,
+    rewrite and re-runs reuse it. It is only re-extracted when the original
+    object's fingerprint (S3 ETag or local size/mtime) no longer matches.
+
+    With `record_failure`, an original that cannot be parsed is stored (and
+    returned) as empty text, so it is rejected as unreadable until it changes.
+    """
+    with session_scope() as db:
+        resume = db.query(Resume).filter(Resume.id == resume_id).first()
+        if not resume:
+            raise ValueError("Resume not found")
+        file_path = resume.s3_key_original
+        stored = resume.extracted_text
+        stored_text = stored.text if stored else None
+        stored_fingerprint = stored.source_fingerprint if stored else None
+
+    try:
+        fingerprint = await asyncio.to_thread(storage.get_file_fingerprint, file_path)
+    except Exception as e:
+        logger.warning(f"Could not fingerprint {file_path}: {e}")
+        fingerprint = None
+
+    if stored_text is not None and fingerprint == stored_fingerprint:
+        return stored_text
+
+    try:
+        extracted = await extract_document(file_path)
+    except Exception as e:
+        # Only when the original was reachable: a storage outage is not a
+        # broken file
+        if not record_failure or fingerprint is None:
+            raise
+        logger.warning(f"Could not parse the original of resume {resume_id}: {e}")
+        _store_text(resume_id, "", None, fingerprint)
+        return ""
+    text = extracted.text
+    if extracted.skipped_pages:
+        logger.warning(
+            f"Resume {resume_id}: {len(extracted.skipped_pages)} of {extracted.page_count} pages "
+            f"timed out during extraction and were left out: {extracted.skipped_pages}"
+        )
+
+    _store_text(resume_id, text, extracted.page_count, fingerprint)
+    return text
+
+
+def _store_text(resume_id: int, text: str, page_count, fingerprint):
+    try:
+        with session_scope() as db:
+            record = db.query(ResumeText).filter(ResumeText.resume_id == resume_id).first()
+            if record is None:
+                record = ResumeText(resume_id=resume_id)
+                db.add(record)
+            record.text = text
+            record.page_count = page_count
+            record.char_count = len(text)
+            record.text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            record.source_fingerprint = fingerprint
+    except IntegrityError:
+        # A concurrent extraction (e.g. upload preprocessing) stored it first
+        pass
+
+
+async def preprocess_resume(resume_id: int):
+    """
+    Upload-time job: extracts and validates the text ahead of /analyze, so
+    analysis starts straight at the LLM call and unreadable uploads are
+    rejected before a credit is spent.
+    """
+    try:
+        text = await get_resume_text(resume_id, record_failure=True)
+    except Exception as e:
+        # Analysis will retry the extraction and report the error
+        logger.warning(f"Preprocessing failed for resume {resume_id}: {e}")
+        return
+
+    if not has_sufficient_text(text):
+        with session_scope() as db:
+            resume = db.query(Resume).filter(Resume.id == resume_id).first()
+            if resume and resume.status == ResumeStatus.UPLOADED:
+                resume.analysis_result = {"error": INSUFFICIENT_TEXT_ERROR}
+                resume.status = ResumeStatus.FAILED
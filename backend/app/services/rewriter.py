@@ -1,8 +1,20 @@
 from app.services.llm import llm
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+import copy
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# "single": one call returns the whole resume. "fanout": one call per section,
+# run concurrently (see rewrite_resume_fanout)
+REWRITE_MODE = os.getenv("REWRITE_MODE", "single").lower()
+REWRITE_FANOUT_CONCURRENCY = int(os.getenv("REWRITE_FANOUT_CONCURRENCY", "4"))
 
 # Professional Resume Rewriting Prompt
-REWRITE_SYSTEM_PROMPT = """You are an expert Executive Resume Writer and ATS Specialist with 15+ years of experience crafting resumes for Fortune 500 executives.
+REWRITE_GUIDELINES = """You are an expert Executive Resume Writer and ATS Specialist with 15+ years of experience crafting resumes for Fortune 500 executives.
 
 Your task is to REWRITE and ENHANCE the candidate's resume while:
 1. PRESERVING all factual information from the original resume
@@ -39,19 +51,19 @@ Your task is to REWRITE and ENHANCE the candidate's resume while:
 ### Projects Section
 - Describe impact and technologies used
 - Quantify results where possible
+"""
 
-## Output Format:
-Return a JSON object with this EXACT structure:
-{
-    "personal_info": {
+# JSON shape of each section of the rewritten resume
+SECTION_SCHEMAS = {
+    "personal_info": """{
         "name": "<candidate's actual name from resume>",
         "email": "<actual email>",
         "phone": "<actual phone>",
         "location": "<actual location>",
         "linkedin": "<actual linkedin if provided>"
-    },
-    "summary": "<compelling 2-3 sentence professional summary>",
-    "experience": [
+    }""",
+    "summary": '"<compelling 2-3 sentence professional summary>"',
+    "experience": """[
         {
             "title": "<job title>",
             "company": "<company name>",
@@ -62,43 +74,72 @@ Return a JSON object with this EXACT structure:
                 ...
             ]
         }
-    ],
-    "education": [
+    ]""",
+    "education": """[
         {
             "degree": "<degree name>",
             "school": "<institution name>",
             "dates": "<graduation year or date range>",
             "details": ["<honors, GPA, relevant coursework>"]
         }
-    ],
-    "skills": {
+    ]""",
+    "skills": """{
         "technical": ["<skill1>", "<skill2>", ...],
         "languages": ["<language1>", ...],
         "soft_skills": ["<skill1>", ...]
-    },
-    "certifications": ["<cert1>", ...],
-    "projects": [
+    }""",
+    "certifications": """["<cert1>", ...]""",
+    "projects": """[
         {
             "name": "<project name>",
             "description": "<enhanced description with impact>"
         }
-    ]
+    ]""",
 }
 
-CRITICAL RULES:
+REWRITE_RULES = """CRITICAL RULES:
 1. NEVER invent information not in the original resume or user answers
 2. ALWAYS preserve names, companies, dates, and contact details exactly
 3. ENHANCE language and presentation while keeping facts accurate
 4. If information is missing and not provided in answers, use null or empty arrays
 """
 
+REWRITE_SYSTEM_PROMPT = REWRITE_GUIDELINES + """
+## Output Format:
+Return a JSON object with this EXACT structure:
+{
+""" + ",\n".join(f'    "{name}": {schema}' for name, schema in SECTION_SCHEMAS.items()) + """
+}
+
+""" + REWRITE_RULES
+
+def _format_answers(user_answers: Dict[str, str]) -> str:
+    formatted_answers = ""
+    for question, answer in user_answers.items():
+        if answer and answer.strip():
+            formatted_answers += f"\nQ: {question}\nA: {answer}\n"
+    return formatted_answers
+
+def _format_analysis(analysis_result: Dict[str, Any]) -> str:
+    candidate_info = (analysis_result or {}).get('candidate_info', {})
+    return f"""=== ANALYSIS RESULTS ===
+Previously identified issues:
+{(analysis_result or {}).get('issues', [])}
+
+Candidate information extracted:
+Name: {candidate_info.get('name', 'Not found')}
+Email: {candidate_info.get('email', 'Not found')}
+Phone: {candidate_info.get('phone', 'Not found')}
+=== END ANALYSIS ==="""
+
 async def rewrite_resume(
     original_text: str, 
     analysis_result: Dict[str, Any], 
     user_answers: Dict[str, str],
     api_keys: Dict[str, str] = None,
     provider: str = None,
-    model: str = None
+    model: str = None,
+    fanout: Optional[bool] = None
 ) -> Dict[str, Any]:
     """
     Rewrite and enhance resume using LLM.
@@ -110,15 +151,13 @@ async def rewrite_resume(
         api_keys: API keys for LLM providers
         provider: LLM provider to use
         model: Specific model to use
+        fanout: Rewrite sections in parallel (default: REWRITE_MODE)
     """
-    # Format user answers nicely
-    formatted_answers = ""
-    for question, answer in user_answers.items():
-        if answer and answer.strip():
-            formatted_answers += f"\nQ: {question}\nA: {answer}\n"
+    if REWRITE_MODE == "fanout" if fanout is None else fanout:
+        return await rewrite_resume_fanout(original_text, analysis_result, user_answers, api_keys, provider=provider, model=model)
     
-    # Extract candidate info if available
-    candidate_info = analysis_result.get('candidate_info', {})
+    # Format user answers nicely
+    formatted_answers = _format_answers(user_answers)
     
     prompt = f"""Rewrite and enhance the following resume professionally.
 
@@ -126,15 +165,7 @@ async def rewrite_resume(
 {original_text[:45000]}
 === END ORIGINAL RESUME ===
 
-=== ANALYSIS RESULTS ===
-Previously identified issues:
-{analysis_result.get('issues', [])}
-
-Candidate information extracted:
-Name: {candidate_info.get('name', 'Not found')}
-Email: {candidate_info.get('email', 'Not found')}
-Phone: {candidate_info.get('phone', 'Not found')}
-=== END ANALYSIS ===
+{_format_analysis(analysis_result)}
 
 === CANDIDATE'S ANSWERS TO CLARIFICATION QUESTIONS ===
 {formatted_answers if formatted_answers else "No additional answers provided."}
@@ -155,3 +186,272 @@ Now rewrite this resume following ATS best practices:
         model=model
     )
     return result
+
+
+# Incremental rewrite: when only some answers change, rewrite just the
+# sections they concern and keep the rest of the stored rewritten content.
+
+SECTION_SYSTEM_PROMPT = REWRITE_GUIDELINES + """
+## Output Format:
+You rewrite ONE section of a resume that has already been rewritten. Return a
+JSON object {"value": <section>} where <section> has EXACTLY this structure:
+%s
+
+""" + REWRITE_RULES
+
+# Keywords in a question/answer that point at a whole section
+SECTION_KEYWORDS = {
+    "summary": ["summary", "career", "goal", "objective", "overview", "years of experience", "profile"],
+    "skills": ["skill", "technolog", "tool", "framework", "programming", "language", "stack"],
+    "education": ["education", "degree", "university", "college", "school", "gpa", "graduat"],
+    "certifications": ["certif", "license"],
+    "projects": ["project"],
+}
+
+def changed_answers(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+    """Questions whose answer was added, changed or removed: {question: (old, new)}."""
+    return {
+        question: ((previous or {}).get(question) or "", (current or {}).get(question) or "")
+        for question in set(previous or {}) | set(current or {})
+        if ((previous or {}).get(question) or "").strip() != ((current or {}).get(question) or "").strip()
+    }
+
+def affected_sections(changes: Dict[str, Tuple[str, str]], content: Dict[str, Any]) -> Optional[List[Tuple[str, Optional[int]]]]:
+    """
+    Maps changed answers to the sections they concern: ("experience", i) or
+    ("projects", i) when a company, title or project name is mentioned,
+    otherwise whole sections by keyword. Returns None when some change cannot
+    be attributed, in which case the whole resume has to be rewritten.
+    """
+    targets = []
+    for question, (old, new) in changes.items():
+        text = f"{question}\n{old}\n{new}".lower()
+        found = []
+        for i, entry in enumerate(content.get("experience") or []):
+            names = [entry.get("company"), entry.get("title")] if isinstance(entry, dict) else []
+            if any(name and len(name) >= 3 and name.lower() in text for name in names):
+                found.append(("experience", i))
+        for i, entry in enumerate(content.get("projects") or []):
+            name = entry.get("name") if isinstance(entry, dict) else None
+            if name and len(name) >= 3 and name.lower() in text:
+                found.append(("projects", i))
+        if not found:
+            found = [
+                (section, None) for section, keywords in SECTION_KEYWORDS.items()
+                if any(keyword in text for keyword in keywords)
+            ]
+        if not found:
+            return None
+        targets.extend(target for target in found if target not in targets)
+
+    # A whole-section target already covers its entries
+    whole = {section for section, index in targets if index is None}
+    return [(section, index) for section, index in targets if index is None or section not in whole]
+
+async def _gather_or_cancel(coros) -> List[Any]:
+    """
+    Like asyncio.gather, but when one coroutine fails the others are
+    cancelled (and waited for) before the error propagates, so a fallback
+    rewrite never runs alongside section calls still spending tokens.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def _valid_section(section: str, index: Optional[int], value: Any) -> bool:
+    if index is not None:
+        return isinstance(value, dict)
+    if section == "summary":
+        return isinstance(value, str)
+    if section in ("personal_info", "skills"):
+        return isinstance(value, (dict, list))
+    return isinstance(value, list)
+
+async def rewrite_section(
+    section: str,
+    index: Optional[int],
+    original_text: str,
+    current: Any,
+    user_answers: Dict[str, str],
+    api_keys: Dict[str, str] = None,
+    provider: str = None,
+    model: str = None,
+    analysis_result: Optional[Dict[str, Any]] = None
+) -> Any:
+    """
+    Rewrites one section (or one entry of a list section) and returns its new
+    value. `analysis_result` gives it the same issues and candidate details as
+    the single-call rewrite.
+    """
+    schema = SECTION_SCHEMAS[section]
+    label = section
+    if index is not None:
+        # One entry of a list section: the item schema is the list's only element
+        schema = schema.strip()[1:-1].strip()
+        label = f"{section} entry #{index + 1}"
+
+    prompt = f"""Rewrite the {label.upper()} section of this resume.
+
+=== ORIGINAL RESUME TEXT ===
+{original_text[:45000]}
+=== END ORIGINAL RESUME ===
+
+{_format_analysis(analysis_result)}
+
+=== CURRENT VERSION OF THIS SECTION ===
+{json.dumps(current, ensure_ascii=False, indent=2) if current is not None else "Not written yet."}
+=== END CURRENT VERSION ===
+
+=== CANDIDATE'S ANSWERS TO CLARIFICATION QUESTIONS ===
+{_format_answers(user_answers) or "No additional answers provided."}
+=== END ANSWERS ===
+
+Return only this section as {{"value": ...}}, incorporating the candidate's answers where relevant."""
+
+    result = await llm.generate_json(
+        prompt,
+        SECTION_SYSTEM_PROMPT % schema,
+        api_keys,
+        provider=provider,
+        model=model
+    )
+    value = result.get("value") if isinstance(result, dict) else None
+    if not _valid_section(section, index, value):
+        raise ValueError(f"Invalid rewrite of section {label}")
+    return value
+
+async def rewrite_resume_incremental(
+    original_text: str,
+    analysis_result: Dict[str, Any],
+    previous_content: Dict[str, Any],
+    previous_answers: Dict[str, str],
+    user_answers: Dict[str, str],
+    api_keys: Dict[str, str] = None,
+    provider: str = None,
+    model: str = None
+) -> Dict[str, Any]:
+    """
+    Re-rewrites only the sections affected by answers that changed since
+    `previous_content` was produced, concurrently, and merges them into a
+    copy of it. Falls back to a full rewrite_resume() when a change cannot be
+    attributed to sections or a section rewrite fails (the other section
+    calls are cancelled first).
+    """
+    changes = changed_answers(previous_answers, user_answers)
+    targets = affected_sections(changes, previous_content) if changes else []
+    if targets is None:
+        logger.info("Changed answers not attributable to sections, rewriting the whole resume")
+        return await rewrite_resume(original_text, analysis_result, user_answers, api_keys, provider=provider, model=model)
+
+    def current_value(section, index):
+        value = previous_content.get(section)
+        return value[index] if index is not None else value
+
+    try:
+        values = await _gather_or_cancel(
+            rewrite_section(
+                section, index, original_text, current_value(section, index),
+                user_answers, api_keys, provider=provider, model=model,
+                analysis_result=analysis_result
+            )
+            for section, index in targets
+        )
+    except Exception as e:
+        logger.warning(f"Section rewrite failed ({e}), rewriting the whole resume")
+        return await rewrite_resume(original_text, analysis_result, user_answers, api_keys, provider=provider, model=model)
+
+    content = copy.deepcopy(previous_content)
+    for (section, index), value in zip(targets, values):
+        if index is not None:
+            content[section][index] = value
+        else:
+            content[section] = value
+    logger.info(f"Incremental rewrite of {len(targets)} section(s): {targets}")
+    return content
+
+
+# Fan-out rewrite: output tokens dominate latency, so instead of one call
+# generating the whole document, a short outline call fixes the structure and
+# each section is then generated by its own concurrent call.
+
+OUTLINE_SYSTEM_PROMPT = """You extract the structure of a resume. Copy values EXACTLY as written in
+the resume; do not rewrite, translate or invent anything.
+
+Return a JSON object with this EXACT structure:
+{
+    "personal_info": %s,
+    "experience": [
+        {
+            "title": "<job title>",
+            "company": "<company name>",
+            "dates": "<start - end>",
+            "location": "<city, country if available>"
+        }
+    ]
+}
+""" % SECTION_SCHEMAS["personal_info"]
+
+# Sections generated whole by the fan-out; experience is split per entry
+FANOUT_SECTIONS = ["summary", "education", "skills", "certifications", "projects"]
+
+async def rewrite_resume_fanout(
+    original_text: str,
+    analysis_result: Dict[str, Any],
+    user_answers: Dict[str, str],
+    api_keys: Dict[str, str] = None,
+    provider: str = None,
+    model: str = None
+) -> Dict[str, Any]:
+    """
+    Rewrites the resume as independent section tasks (summary, each
+    experience entry, education, skills, certifications, projects) run
+    concurrently, at most REWRITE_FANOUT_CONCURRENCY at a time, and assembles
+    them into the same schema as rewrite_resume(). Falls back to the single
+    call if the outline or any section fails, after cancelling the other
+    section calls.
+    """
+    try:
+        outline = await llm.generate_json(
+            f"=== RESUME TEXT ===\n{original_text[:45000]}\n=== END RESUME TEXT ===",
+            OUTLINE_SYSTEM_PROMPT,
+            api_keys,
+            provider=provider,
+            model=model
+        )
+        personal_info = outline.get("personal_info") if isinstance(outline, dict) else None
+        entries = outline.get("experience") if isinstance(outline, dict) else None
+        if not isinstance(personal_info, dict) or not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            raise ValueError("Invalid resume outline")
+
+        semaphore = asyncio.Semaphore(REWRITE_FANOUT_CONCURRENCY)
+
+        async def task(section, index, current):
+            async with semaphore:
+                return await rewrite_section(
+                    section, index, original_text, current, user_answers,
+                    api_keys, provider=provider, model=model,
+                    analysis_result=analysis_result
+                )
+
+        targets = [("experience", i, entry) for i, entry in enumerate(entries)]
+        targets += [(section, None, None) for section in FANOUT_SECTIONS]
+        values = await _gather_or_cancel(task(*target) for target in targets)
+    except Exception as e:
+        logger.warning(f"Fan-out rewrite failed ({e}), falling back to a single rewrite call")
+        return await rewrite_resume(original_text, analysis_result, user_answers, api_keys, provider=provider, model=model, fanout=False)
+
+    content = {"personal_info": personal_info, "experience": []}
+    for (section, index, skeleton), value in zip(targets, values):
+        if section == "experience":
+            # Titles, companies and dates are facts from the outline
+            value.update({key: skeleton[key] for key in ("title", "company", "dates") if skeleton.get(key)})
+            content["experience"].append(value)
+        else:
+            content[section] = value
+    return content
+
@@ -0,0 +1,71 @@
+import json
+from typing import Any, List, Tuple
+
+
+class JSONFieldStream:
+    """
+    Incremental parser for a streamed JSON object: feed it text chunks as
+    they arrive and it returns each top-level field as soon as its value is
+    complete, e.g. `score` long before `clarification_questions` is written.
+
+    Text before the opening brace (such as a ```json fence) is skipped. Only
+    string state and nesting depth are tracked while scanning, so every
+    character is looked at once; complete values are decoded with json.loads.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.done = False
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        fields = []
+        buffer = self.buffer
+        i = self.pos
+        while i < len(buffer) and not self.done:
+            char = buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.key_start is not None:
+                        self.key = json.loads(buffer[self.key_start:i + 1])
+                        self.key_start = None
+            elif char == '"':
+                self.in_string = True
+                if self.depth == 1 and self.key is None and self.value_start is None:
+                    self.key_start = i
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._emit(buffer[self.value_start:i] if self.value_start is not None else None, fields)
+                    self.done = True
+            elif self.depth == 1:
+                if char == ":" and self.key is not None and self.value_start is None:
+                    self.value_start = i + 1
+                elif char == ",":
+                    self._emit(buffer[self.value_start:i] if self.value_start is not None else None, fields)
+            i += 1
+        self.pos = i
+        return fields
+
+    def _emit(self, raw, fields: List[Tuple[str, Any]]):
+        if self.key is not None and raw is not None and raw.strip():
+            try:
+                fields.append((self.key, json.loads(raw)))
+            except json.JSONDecodeError:
+                pass
+        self.key = None
+        self.value_start = None
@@ -1,50 +1,230 @@
 import PyPDF2
-# import docx  # python-docx
 from fastapi import UploadFile
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, List, Optional
+from collections import deque
+import multiprocessing
+import asyncio
+import logging
+import tempfile
+import zipfile
+import shutil
+import os
 import io
+from xml.etree.ElementTree import iterparse
+from app.core.process_pool import ProcessPool, WorkerLost
 
-async def extract_text_from_pdf(file_bytes: bytes) -> str:
-    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-    text = ""
+logger = logging.getLogger(__name__)
+
+# Extraction stops once this many characters are collected. The analysis
+# prompt only uses the first 50,000 characters, so parsing further pages of a
+# long document is wasted work.
+MAX_EXTRACTED_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "50000"))
+
+# S3 objects are buffered in memory up to this size, then spill to disk
+S3_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Documents with at least this many pages are split into shards of
+# PAGES_PER_SHARD pages that are extracted in parallel worker processes;
+# typical one or two page resumes stay in-process.
+PARALLEL_MIN_PAGES = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", "16"))
+PAGES_PER_SHARD = int(os.getenv("EXTRACTION_PAGES_PER_SHARD", "8"))
+# Per-page time limit; a shard that exceeds it is killed and its pages skipped
+PAGE_TIMEOUT = float(os.getenv("EXTRACTION_PAGE_TIMEOUT", "10"))
+# Times a shard is resubmitted after its worker was killed for another task
+SHARD_RESUBMITS = 2
+
+extraction_pool = ProcessPool(
+    "extraction",
+    size=int(os.getenv("EXTRACTION_POOL_SIZE", str(min(4, multiprocessing.cpu_count())))),
+)
+
+@dataclass
+class ExtractedText:
+    text: str
+    page_count: Optional[int] = None
+    # Pages (0-based) left out because extracting them timed out
+    skipped_pages: List[int] = field(default_factory=list)
+
+def iter_pdf_pages(reader: PyPDF2.PdfReader) -> Iterator[str]:
+    """Yields the text of each page in order, parsing pages lazily."""
     for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+        yield page.extract_text() or ""
+
+def read_pdf(stream: BinaryIO, max_chars: int = MAX_EXTRACTED_CHARS) -> ExtractedText:
+    """
+    Extracts text from a seekable PDF stream, stopping at `max_chars`.
+
+    Page texts are collected in a list and joined once rather than
+    concatenated, and the file is read through the stream instead of being
+    loaded into memory up front.
+    """
+    reader = PyPDF2.PdfReader(stream)
+    if len(reader.pages) >= PARALLEL_MIN_PAGES and extraction_pool.size > 1:
+        return read_pdf_pooled(stream, len(reader.pages), max_chars)
+
+    pages = []
+    collected = 0
+    for page_text in iter_pdf_pages(reader):
+        pages.append(page_text)
+        collected += len(page_text) + 1
+        if collected >= max_chars:
+            break
+    text = "\n".join(pages) + "\n"
+    return ExtractedText(text=text[:max_chars], page_count=len(reader.pages))
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Worker-process task: extract pages [start, end) of the PDF at `path`."""
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def read_pdf_pooled(stream: BinaryIO, page_count: int, max_chars: int = MAX_EXTRACTED_CHARS) -> ExtractedText:
+    """
+    read_pdf_parallel() for a seekable PDF stream. Workers read the file
+    themselves, so shards only carry its path: a local file is used where it
+    is, anything else is spooled to a temporary file once.
+    """
+    path = getattr(stream, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return read_pdf_parallel(os.path.abspath(path), page_count, max_chars)
+    stream.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="extraction-", suffix=".pdf") as spooled:
+        shutil.copyfileobj(stream, spooled)
+        spooled.flush()
+        return read_pdf_parallel(spooled.name, page_count, max_chars)
+
+def read_pdf_parallel(path: str, page_count: int, max_chars: int = MAX_EXTRACTED_CHARS) -> ExtractedText:
+    """
+    Extracts page shards of the PDF at `path` across the extraction process
+    pool, preserving page order. Only `pool.size` shards are in flight at a
+    time so extraction still stops early once the character budget is
+    reached.
+    """
+    shards = deque(
+        (start, min(start + PAGES_PER_SHARD, page_count))
+        for start in range(0, page_count, PAGES_PER_SHARD)
+    )
+    in_flight = deque()
+    pages = []
+    skipped = []
+    collected = 0
+
+    def submit(start, end, resubmits=0):
+        return start, end, resubmits, extraction_pool.submit(_extract_page_range, path, start, end)
+
+    def fill():
+        while shards and len(in_flight) < extraction_pool.size:
+            in_flight.append(submit(*shards.popleft()))
+
+    fill()
+    while in_flight and collected < max_chars:
+        start, end, resubmits, task = in_flight.popleft()
+        try:
+            shard_pages = task.result(timeout=PAGE_TIMEOUT * (end - start))
+        except multiprocessing.TimeoutError:
+            # Only the worker running this shard was killed
+            logger.warning(f"Extraction of pages {start}-{end - 1} timed out, skipping them")
+            shard_pages = [""] * (end - start)
+            skipped.extend(range(start, end))
+        except WorkerLost:
+            # Picked up by a worker killed for another (hung) task
+            if resubmits >= SHARD_RESUBMITS:
+                raise
+            in_flight.appendleft(submit(start, end, resubmits + 1))
+            continue
 
-# async def extract_text_from_docx(file_bytes: bytes) -> str:
-#    doc = docx.Document(io.BytesIO(file_bytes))
-#    full_text = []
-#    for para in doc.paragraphs:
-#        full_text.append(para.text)
-#    return '\n'.join(full_text)
+        for page_text in shard_pages:
+            pages.append(page_text)
+            collected += len(page_text) + 1
+        fill()
+
+    text = "\n".join(pages) + "\n"
+    return ExtractedText(text=text[:max_chars], page_count=page_count, skipped_pages=skipped)
+
+async def extract_pdf(file_bytes: bytes) -> ExtractedText:
+    return await asyncio.to_thread(read_pdf, io.BytesIO(file_bytes))
+
+async def extract_text_from_pdf(file_bytes: bytes) -> str:
+    return (await extract_pdf(file_bytes)).text
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def read_docx(stream: BinaryIO, max_chars: int = MAX_EXTRACTED_CHARS) -> ExtractedText:
+    """
+    Extracts text from a seekable DOCX stream.
+
+    Streams `word/document.xml` out of the zip with iterparse and clears each
+    paragraph once its text is collected, instead of building a python-docx
+    object model, so memory stays bounded however large the document is.
+    """
+    paragraphs = []
+    collected = 0
+    with zipfile.ZipFile(stream) as archive:
+        with archive.open("word/document.xml") as document:
+            runs = []
+            for _, elem in iterparse(document, events=("end",)):
+                tag = elem.tag
+                if tag == WORD_NS + "t":
+                    runs.append(elem.text or "")
+                elif tag == WORD_NS + "tab":
+                    runs.append("\t")
+                elif tag in (WORD_NS + "br", WORD_NS + "cr"):
+                    runs.append("\n")
+                elif tag == WORD_NS + "p":
+                    paragraph = "".join(runs)
+                    runs = []
+                    paragraphs.append(paragraph)
+                    collected += len(paragraph) + 1
+                    elem.clear()
+                    if collected >= max_chars:
+                        break
+    text = "\n".join(paragraphs)
+    return ExtractedText(text=text[:max_chars])
+
+async def extract_text_from_docx(file_bytes: bytes) -> str:
+    return (await asyncio.to_thread(read_docx, io.BytesIO(file_bytes))).text
 
 async def extract_text(file_path: str) -> str:
+    return (await extract_document(file_path)).text
+
+async def extract_document(file_path: str) -> ExtractedText:
+    # Download and parsing are blocking and CPU-bound; keep them off the event loop
+    return await asyncio.to_thread(_extract_document, file_path)
+
+def _extract_document(file_path: str) -> ExtractedText:
     from app.core.storage import storage
-    import io
 
     # S3 Handling
     if file_path.startswith("s3://"):
         if not storage.s3_client:
             raise Exception("S3 Configured but Client failed")
-        
+
         # Parse Bucket/Key
         path_parts = file_path.replace("s3://", "").split("/", 1)
         bucket = path_parts[0]
         key = path_parts[1]
-        
-        obj = storage.s3_client.get_object(Bucket=bucket, Key=key)
-        file_content = obj['Body'].read()
-        
-        # Determine extension from key (or assume PDF for now)
-        if key.endswith(".pdf"):
-             # Call the async function synchronously since we are in sync or refactor
-             # Actually extract_text_from_pdf is async, but we are calling it from here.
-             # Ideally this function should be async.
-             # For MVP hack, let's just make extract_text_from_pdf sync or run loop
-             return await extract_text_from_pdf(file_content)
-             
+
+        # Determine extension from key
+        reader = _get_reader(key)
+        if reader:
+            with tempfile.SpooledTemporaryFile(max_size=S3_SPOOL_MAX_BYTES) as buffer:
+                storage.s3_client.download_fileobj(bucket, key, buffer)
+                buffer.seek(0)
+                return reader(buffer)
+        return ExtractedText(text="")
+
     # Local Handling
-    if file_path.endswith(".pdf"):
+    reader = _get_reader(file_path)
+    if reader:
         with open(file_path, "rb") as f:
-            return await extract_text_from_pdf(f.read())
-            
-    return ""
+            return reader(f)
+
+    return ExtractedText(text="")
+
+def _get_reader(path: str):
+    if path.endswith(".pdf"):
+        return read_pdf
+    if path.endswith(".docx"):
+        return read_docx
+    return None
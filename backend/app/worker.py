@@ -0,0 +1,86 @@
+"""
+Job worker for upload preprocessing, analysis, rewrite and bulk re-render jobs.
+
+Run one or more of these next to the API (requires REDIS_URL):
+
+    python -m app.worker --concurrency 8
+    python -m app.worker --queues rewrite --concurrency 4
+
+Each process runs `--concurrency` jobs at a time, so LLM throughput scales
+with the number of worker processes independently of the HTTP tier.
+"""
+import os
+import asyncio
+import argparse
+import logging
+import traceback
+
+from app.core.queue import job_queue
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+DEFAULT_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+
+
+def load_handlers():
+    """Import the modules that register job handlers on `job_queue`."""
+    from app.api.v1.endpoints import upload, analysis, rewrite, admin  # noqa: F401
+
+
+async def _run_job(name: str, job_id: str, payload: dict):
+    async def keep_leased():
+        while True:
+            await asyncio.sleep(job_queue.visibility_timeout / 3)
+            await job_queue.extend(name, job_id)
+
+    heartbeat = asyncio.create_task(keep_leased())
+    try:
+        await job_queue.handlers[name](**payload)
+    except Exception as e:
+        logger.error(f"Job {name}:{job_id} failed: {e}")
+        traceback.print_exc()
+        await job_queue.release(name, job_id)
+        return
+    finally:
+        heartbeat.cancel()
+    await job_queue.ack(name, job_id)
+
+
+async def _worker_slot(queues: list):
+    while True:
+        job = await job_queue.claim(queues)
+        if job is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            continue
+        job_id, name, payload = job
+        await _run_job(name, job_id, payload)
+
+
+async def run_worker(queues: list, concurrency: int):
+    if get_redis() is None:
+        raise RuntimeError("REDIS_URL must be set to run a worker")
+    load_handlers()
+    queues = queues or list(job_queue.handlers)
+    logger.info(f"Worker started: queues={queues}, concurrency={concurrency}")
+    await asyncio.gather(*(_worker_slot(queues) for _ in range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued analysis and rewrite jobs.")
+    parser.add_argument("--queues", nargs="*", default=None, help="Queues to consume (default: all)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Jobs processed concurrently by this process",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(args.queues, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
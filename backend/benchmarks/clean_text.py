@@ -0,0 +1,64 @@
+"""
+PDFGenerator._clean_text micro-benchmark, against the chained str.replace
+version it replaced.
+
+    cd backend && python -m benchmarks.clean_text --calls 200000
+
+Times the latin-1 path (no Unicode font installed) that actually rewrites
+text, plus the Unicode-font path, which returns text unchanged.
+"""
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLES = {
+    "ascii bullet": "- Led the migration of the billing platform to event-driven services, cutting costs by 30%",
+    "curly quotes/dash/arrow": "• Rebuilt the “fast path” – p99 latency 800ms → 120ms for the team’s API",
+    "turkish, nothing to map": "Ödeme altyapısının olay tabanlı servislere geçişini yönettim; maliyetleri %30 düşürdüm",
+}
+
+
+def old_clean_text(text: str) -> str:
+    """_clean_text before the punctuation table: nine chained replaces."""
+    if not text:
+        return ""
+    text = str(text)
+    text = text.replace("•", "-")
+    text = text.replace("▪", "-")
+    text = text.replace("→", "->")
+    text = text.replace("–", "-")
+    text = text.replace("—", "-")
+    # The curly-quote replacements had been saved with plain ASCII quotes
+    text = text.replace('"', '"')
+    text = text.replace('"', '"')
+    text = text.replace("'", "'")
+    text = text.replace("'", "'")
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    from app.services.pdf_generator import PDFGenerator
+    latin1 = PDFGenerator()
+    latin1.unicode_font = False
+    unicode = PDFGenerator()
+    unicode.unicode_font = True
+
+    print(f"{args.calls} calls each")
+    print(f"{'sample':<26} {'before':>8} {'latin-1':>8} {'unicode':>8}")
+    for name, text in SAMPLES.items():
+        timings = [
+            min(timeit.repeat(lambda: clean(text), number=args.calls, repeat=3))
+            for clean in (old_clean_text, latin1._clean_text, unicode._clean_text)
+        ]
+        print(f"{name:<26} " + " ".join(f"{seconds:>7.3f}s" for seconds in timings))
+
+
+if __name__ == "__main__":
+    main()
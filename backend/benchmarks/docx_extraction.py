@@ -0,0 +1,71 @@
+"""
+Streaming DOCX extraction (read_docx) vs python-docx on synthetic documents.
+
+    cd backend && python -m benchmarks.docx_extraction --paragraphs 100 1000 10000
+
+Reports the median time and the tracemalloc peak of each, and checks that
+both produce the same text.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.factories import make_docx
+
+UNLIMITED = 10 ** 9
+
+
+def _python_docx(data: bytes) -> str:
+    from docx import Document
+    return "\n".join(p.text for p in Document(io.BytesIO(data)).paragraphs)
+
+
+def _read_docx(data: bytes) -> str:
+    from app.utils.text_extractor import read_docx
+    return read_docx(io.BytesIO(data), UNLIMITED).text
+
+
+def _measure(fn, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = fn(data)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, nargs="*", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Import both parsers before timing anything
+    _python_docx(make_docx(1))
+    _read_docx(make_docx(1))
+
+    print(f"{'paragraphs':>10} {'size':>8} {'python-docx':>22} {'read_docx':>22}")
+    for paragraphs in args.paragraphs:
+        data = make_docx(paragraphs)
+        docx_time, docx_peak, expected = _measure(_python_docx, data, args.repeat)
+        read_time, read_peak, text = _measure(_read_docx, data, args.repeat)
+        assert text == expected
+        print(
+            f"{paragraphs:>10} {len(data) / 1024:>6.0f}KB "
+            f"{docx_time * 1000:>9.1f}ms {docx_peak / 2 ** 20:>8.1f}MiB "
+            f"{read_time * 1000:>9.1f}ms {read_peak / 2 ** 20:>8.1f}MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+/health latency while N analyses are waiting on a (fake, local) LLM provider.
+
+    cd backend && python -m benchmarks.health_latency --analyses 50
+
+Analyses go through the real pipeline and the real AsyncOpenAI client,
+pointed at tests/fake_provider.py. --blocking replaces the provider call
+with the synchronous SDK call the service used to make, for comparison.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="resume-platform-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+os.environ["ANALYSIS_CACHE_BACKEND"] = "off"
+for _var in ("REDIS_URL", "OPENAI_API_KEY", "GOOGLE_API_KEY", "ANTHROPIC_API_KEY"):
+    os.environ.pop(_var, None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from tests.factories import create_resumes
+from tests.fake_provider import FakeProvider
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+
+async def _probe(client, until, interval=0.02):
+    """
+    Request /health every `interval`. Latency counts from when the request
+    was due, so time the loop spent blocked before sending it is included.
+    """
+    latencies = []
+    while not until():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await client.get("/health")
+        latencies.append(time.perf_counter() - due)
+    return latencies
+
+
+async def _measure(warmup_id, resume_ids):
+    from app.api.v1.endpoints.analysis import process_analysis
+    from app.main import app
+    from app.services.llm_clients import llm_client_pool
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # First request, first query and first SDK client are one-off costs
+        await client.get("/health")
+        await process_analysis(warmup_id, {"openai": "bench-key"}, "openai", None)
+        idle_until = time.perf_counter() + 1.0
+        idle = await _probe(client, lambda: time.perf_counter() > idle_until)
+
+        started = time.perf_counter()
+        jobs = asyncio.gather(*(
+            process_analysis(resume_id, {"openai": "bench-key"}, "openai", None) for resume_id in resume_ids
+        ))
+        loaded = await _probe(client, jobs.done)
+        await jobs
+        elapsed = time.perf_counter() - started
+    await llm_client_pool.close_all()
+    return idle, loaded, elapsed
+
+
+def _use_blocking_sdk():
+    """The pre-async provider call: the synchronous SDK, called on the event loop."""
+    from openai import OpenAI
+    from app.services.llm import LLMService
+
+    async def stream_openai(self, prompt, system_prompt, api_key, model):
+        stream = OpenAI(api_key=api_key).chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    LLMService._stream_openai = stream_openai
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--analyses", type=int, default=50)
+    parser.add_argument("--provider-seconds", type=float, default=2.0, help="Duration of each fake completion")
+    parser.add_argument("--blocking", action="store_true", help="Use the synchronous SDK call (old behaviour)")
+    args = parser.parse_args()
+
+    # Imported up front: importing the app inside the measured loop would
+    # show up as a stall
+    import app.main  # noqa: F401
+    import app.api.v1.endpoints.analysis  # noqa: F401
+    if args.blocking:
+        _use_blocking_sdk()
+    warmup_id, *resume_ids = create_resumes(args.analyses + 1, _tmp)
+    with FakeProvider(delay=args.provider_seconds).serve() as provider:
+        idle, loaded, elapsed = asyncio.run(_measure(warmup_id, resume_ids))
+
+    print(f"{args.analyses} analyses, {args.provider_seconds:.1f}s per completion, "
+          f"{'blocking' if args.blocking else 'async'} provider calls")
+    print(f"  analyses finished in {elapsed:.1f}s, up to {provider.max_in_flight} provider calls in flight")
+    for label, latencies in (("idle", idle), ("under load", loaded)):
+        print(f"  /health {label:>10}: {len(latencies):4d} probes, p50 {_percentile(latencies, 50):7.1f} ms, "
+              f"p99 {_percentile(latencies, 99):7.1f} ms, max {max(latencies) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Serial vs process-pool PDF text extraction on synthetic 1/10/100-page PDFs.
+
+    cd backend && python -m benchmarks.pdf_extraction --repeat 5
+
+Both paths extract every page (no character budget). The pool is started
+and warmed up before timing; its cold start is reported separately. The
+pooled timing includes spooling the PDF to a temporary file.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.factories import make_pdf
+
+UNLIMITED = 10 ** 9
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="*", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.utils import text_extractor
+    pool = text_extractor.extraction_pool
+    # Serial: never hand off to the pool
+    text_extractor.PARALLEL_MIN_PAGES = UNLIMITED
+
+    started = time.perf_counter()
+    text_extractor.read_pdf_pooled(io.BytesIO(make_pdf(pool.size)), pool.size, UNLIMITED)
+    print(f"pool: {pool.size} workers, {text_extractor.PAGES_PER_SHARD} pages per shard, "
+          f"cold start {time.perf_counter() - started:.2f}s ({os.cpu_count()} CPUs)")
+    print(f"{'pages':>6} {'serial':>10} {'pooled':>10} {'speedup':>8}")
+    try:
+        for pages in args.pages:
+            pdf = make_pdf(pages)
+            serial, serial_result = _time(lambda: text_extractor.read_pdf(io.BytesIO(pdf), UNLIMITED), args.repeat)
+            pooled, pooled_result = _time(lambda: text_extractor.read_pdf_pooled(io.BytesIO(pdf), pages, UNLIMITED), args.repeat)
+            assert pooled_result.text == serial_result.text
+            print(f"{pages:>6} {serial * 1000:>8.1f}ms {pooled * 1000:>8.1f}ms {serial / pooled:>7.2f}x")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
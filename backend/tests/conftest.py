@@ -0,0 +1,43 @@
+import os
+import asyncio
+import tempfile
+
+# Configure the app before anything imports it: a throwaway SQLite database,
+# no Redis (jobs run in-process), no analysis cache and no provider keys
+# from the environment, so every LLM call goes to the fake provider.
+_tmp = tempfile.mkdtemp(prefix="resume-platform-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["ANALYSIS_CACHE_BACKEND"] = "off"
+for _var in ("REDIS_URL", "OPENAI_API_KEY", "GOOGLE_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_BASE_URL"):
+    os.environ.pop(_var, None)
+
+import pytest
+
+from tests.factories import create_resumes
+
+
+@pytest.fixture
+def resumes():
+    """Callable creating `count` analyzable resumes (text already extracted) for a new user."""
+    return lambda count: create_resumes(count, _tmp)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """Callable running an async test body against a fresh in-memory Redis (REDIS_URL=fakeredis://)."""
+    import fakeredis
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(redis_module, "REDIS_URL", "fakeredis://")
+
+    def run(body):
+        async def main():
+            client = fakeredis.FakeAsyncRedis(decode_responses=True)
+            monkeypatch.setattr(redis_module, "_client", client)
+            try:
+                return await body(client)
+            finally:
+                await client.aclose()
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,79 @@
+import io
+import os
+import uuid
+from typing import List
+
+RESUME_TEXT = """Test Candidate - Senior Software Engineer
+test@example.com | +1 555 0100
+
+EXPERIENCE
+Acme Corp, Senior Engineer, 2019 - 2024
+- Led the migration of the billing platform to event-driven services
+- Reduced infrastructure costs by 30% by consolidating clusters
+
+EDUCATION
+BSc Computer Science, State University, 2015
+"""
+
+
+def create_resumes(count: int, directory: str) -> List[int]:
+    """
+    A new user with `count` resumes whose text is already extracted, so a
+    job starts straight at the LLM call. Each resume gets a small original
+    file so the stored text's fingerprint matches it.
+    """
+    from app.core.security import get_password_hash
+    from app.core.storage import storage
+    from app.db.session import Base, engine, session_scope
+    from app.models import Resume, ResumeStatus, ResumeText, User
+
+    Base.metadata.create_all(bind=engine)
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password=get_password_hash("password123"), credits=count)
+        db.add(user)
+        db.flush()
+        resume_ids = []
+        for i in range(count):
+            path = os.path.join(directory, f"{uuid.uuid4().hex}.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4 placeholder")
+            text = f"{RESUME_TEXT}\nResume #{i}\n"
+            resume = Resume(user_id=user.id, original_filename=f"resume-{i}.pdf", s3_key_original=path, status=ResumeStatus.UPLOADED)
+            resume.extracted_text = ResumeText(
+                text=text,
+                char_count=len(text),
+                source_fingerprint=storage.get_file_fingerprint(path),
+            )
+            db.add(resume)
+            db.flush()
+            resume_ids.append(resume.id)
+    return resume_ids
+
+
+def make_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A text PDF of `pages` pages, each line tagged with its page and line number."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        for line in range(lines_per_page):
+            pdf.cell(0, 6, f"Page {page + 1} line {line + 1}: Led a team of engineers delivering analytics features", new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def make_docx(paragraphs: int) -> bytes:
+    """A DOCX of `paragraphs` numbered paragraphs, some with tabs and line breaks."""
+    from docx import Document
+
+    document = Document()
+    for number in range(paragraphs):
+        paragraph = document.add_paragraph(f"Paragraph {number + 1}: Designed and shipped ")
+        paragraph.add_run("resume parsing for Çağrı Şükrü\tİstanbul").bold = True
+        if number % 10 == 0:
+            paragraph.add_run().add_break()
+            paragraph.add_run("Reduced processing time by 40%")
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
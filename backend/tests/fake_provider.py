@@ -0,0 +1,123 @@
+"""
+A local stand-in for the OpenAI chat completions API, for load tests and
+benchmarks that must exercise the real async SDK path without network access.
+
+It runs an HTTP server in a background thread; point the SDK at it with
+OPENAI_BASE_URL (the client pool creates AsyncOpenAI clients that read it).
+Every completion takes `delay` seconds, streamed in `chunks` pieces when the
+request asks for a stream.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator
+
+ANALYSIS_RESPONSE = {
+    "candidate_info": {"name": "Test Candidate", "email": "test@example.com", "phone": None},
+    "score": 72,
+    "ats_score": 68,
+    "strengths": ["Clear structure"],
+    "issues": ["Bullets lack metrics"],
+    "clarification_questions": ["Which results did you achieve at your last job?"],
+}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of clients connect at once in the stress tests
+    request_queue_size = 1024
+
+
+class FakeProvider:
+    def __init__(self, delay: float = 0.5, chunks: int = 8, response: Dict[str, Any] = None):
+        self.delay = delay
+        self.chunks = chunks
+        self.response = response or ANALYSIS_RESPONSE
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _handler(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with provider._lock:
+                    provider.requests += 1
+                    provider.in_flight += 1
+                    provider.max_in_flight = max(provider.max_in_flight, provider.in_flight)
+                try:
+                    content = json.dumps(provider.response)
+                    model = body.get("model", "fake")
+                    if body.get("stream"):
+                        self._stream(content, model)
+                    else:
+                        time.sleep(provider.delay)
+                        self._send_json({
+                            "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": content}}],
+                            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                        })
+                finally:
+                    with provider._lock:
+                        provider.in_flight -= 1
+
+            def _send_json(self, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, content, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                size = max(1, -(-len(content) // provider.chunks))
+                for start in range(0, len(content), size):
+                    time.sleep(provider.delay / provider.chunks)
+                    self._chunk({
+                        "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}],
+                    })
+                self._write(b"data: [DONE]\n\n")
+                self._write(b"")
+
+            def _chunk(self, payload):
+                self._write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def _write(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    @contextmanager
+    def serve(self) -> Iterator["FakeProvider"]:
+        server = _Server(("127.0.0.1", 0), self._handler())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        previous = os.environ.get("OPENAI_BASE_URL")
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        try:
+            yield self
+        finally:
+            if previous is None:
+                os.environ.pop("OPENAI_BASE_URL", None)
+            else:
+                os.environ["OPENAI_BASE_URL"] = previous
+            server.shutdown()
+            server.server_close()
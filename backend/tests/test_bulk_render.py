@@ -0,0 +1,69 @@
+import os
+import asyncio
+
+import pytest
+
+CONTENT = {"personal_info": {"name": "Test Candidate"}, "summary": "Engineer.", "experience": [], "skills": ["Python"]}
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    from app.core.storage import storage
+    monkeypatch.setattr(storage, "local_storage_path", str(tmp_path))
+    return tmp_path
+
+
+def _completed(resumes, count: int):
+    from app.db.session import session_scope
+    from app.models import Resume, ResumeStatus
+
+    resume_ids = resumes(count)
+    with session_scope() as db:
+        for resume_id in resume_ids:
+            resume = db.get(Resume, resume_id)
+            resume.status = ResumeStatus.COMPLETED
+            resume.analysis_result = {"rewritten_content": {**CONTENT, "summary": f"Resume {resume_id}"}}
+            resume.s3_key_generated_pdf = "renders/old.pdf"
+    return resume_ids
+
+
+def _run_batch():
+    from app.db.session import session_scope
+    from app.models import RenderBatch
+    from app.services.bulk_render import batch_progress, create_render_batch, run_render_batch
+
+    with session_scope() as db:
+        batch_id = create_render_batch(db).id
+    asyncio.run(run_render_batch(batch_id))
+    with session_scope() as db:
+        return batch_progress(db.get(RenderBatch, batch_id))
+
+
+def test_failed_renders_store_nothing_and_keep_the_previous_pdf(resumes, storage_dir, monkeypatch):
+    from app.db.session import session_scope
+    from app.models import Resume
+    from app.services import documents
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("renderer crashed")
+
+    monkeypatch.setattr(documents.render_pool, "run", fail)
+    resume_ids = _completed(resumes, 3)
+
+    progress = _run_batch()
+
+    assert progress["status"] == "completed"
+    assert progress["failed"] >= 3 and progress["rendered"] == 0
+    assert os.listdir(storage_dir) == []
+    with session_scope() as db:
+        assert {db.get(Resume, resume_id).s3_key_generated_pdf for resume_id in resume_ids} == {"renders/old.pdf"}
+
+
+def test_percent_never_exceeds_100():
+    from app.models import RenderBatch, RenderBatchStatus
+    from app.services.bulk_render import batch_progress
+
+    # Resumes completed after the batch was created are processed too
+    batch = RenderBatch(status=RenderBatchStatus.RUNNING, total=10, processed=12)
+
+    assert batch_progress(batch)["percent"] == 100.0
@@ -0,0 +1,107 @@
+"""
+Jobs only hold a pooled connection around their status reads and writes,
+never across the LLM call, so a pool of 10 sustains hundreds of concurrent
+analyses. The control case shows the same pool running out when a
+connection is held for the whole call, as the jobs used to.
+"""
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from tests.fake_provider import FakeProvider
+
+JOBS = 200
+POOL_SIZE = 10
+
+
+@contextmanager
+def small_pool(pool_timeout: float):
+    """Point every session at an engine with a fixed pool of POOL_SIZE connections, tracking peak use."""
+    from app.db.session import DATABASE_URL, SessionLocal, engine
+
+    small = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+    )
+    usage = {"checked_out": 0, "peak": 0}
+
+    @event.listens_for(small, "checkout")
+    def on_checkout(*args):
+        usage["checked_out"] += 1
+        usage["peak"] = max(usage["peak"], usage["checked_out"])
+
+    @event.listens_for(small, "checkin")
+    def on_checkin(*args):
+        usage["checked_out"] -= 1
+
+    SessionLocal.configure(bind=small)
+    try:
+        yield usage
+    finally:
+        SessionLocal.configure(bind=engine)
+        small.dispose()
+
+
+@pytest.fixture
+def unthrottled(monkeypatch):
+    # Let all jobs reach the provider at once instead of LLM_CONCURRENCY at a time
+    from app.services.llm_scheduler import llm_scheduler
+    monkeypatch.setattr(llm_scheduler, "default_capacity", JOBS)
+
+
+async def _analyze_all(resume_ids, process):
+    from app.services.llm_clients import llm_client_pool
+    try:
+        return await asyncio.gather(*(
+            process(resume_id, {"openai": "stress-key"}, "openai", None) for resume_id in resume_ids
+        ), return_exceptions=True)
+    finally:
+        await llm_client_pool.close_all()
+
+
+def test_pool_of_ten_sustains_hundreds_of_concurrent_jobs(resumes, unthrottled):
+    from app.api.v1.endpoints.analysis import process_analysis
+    from app.db.session import session_scope
+    from app.models import Resume, ResumeStatus
+
+    resume_ids = resumes(JOBS)
+    with FakeProvider(delay=1.0).serve() as provider, small_pool(pool_timeout=2) as usage:
+        results = asyncio.run(_analyze_all(resume_ids, process_analysis))
+
+    assert [r for r in results if isinstance(r, BaseException)] == []
+    with session_scope() as db:
+        statuses = {status for (status,) in db.query(Resume.status).filter(Resume.id.in_(resume_ids))}
+    assert statuses == {ResumeStatus.WAITING_INPUT}
+    # All jobs were waiting on the provider at the same time...
+    assert provider.max_in_flight > POOL_SIZE * 5
+    # ...while never needing more than the pool, and returning every connection
+    assert usage["peak"] <= POOL_SIZE
+    assert usage["checked_out"] == 0
+
+
+def test_holding_a_session_across_the_llm_call_exhausts_the_pool(resumes, unthrottled):
+    from app.db.session import SessionLocal
+    from app.models import Resume
+    from app.services.analyzer import analyze_resume_text
+
+    async def process_holding_session(resume_id, api_keys, provider, model):
+        db = SessionLocal()
+        try:
+            resume = db.query(Resume).filter(Resume.id == resume_id).first()
+            result = await analyze_resume_text(resume.extracted_text.text, api_keys, provider, model)
+            resume.analysis_result = result
+            db.commit()
+        finally:
+            db.close()
+
+    resume_ids = resumes(POOL_SIZE * 3)
+    with FakeProvider(delay=1.0).serve(), small_pool(pool_timeout=0.5):
+        results = asyncio.run(_analyze_all(resume_ids, process_holding_session))
+
+    assert any(isinstance(r, PoolTimeoutError) for r in results)
@@ -0,0 +1,102 @@
+import os
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+CONTENT = {"personal_info": {"name": "Test Candidate"}, "summary": "Engineer.", "experience": [], "skills": ["Python"]}
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    from app.core.storage import storage
+    monkeypatch.setattr(storage, "local_storage_path", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def failing_renders(monkeypatch):
+    from app.services import documents
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("renderer crashed")
+
+    monkeypatch.setattr(documents.render_pool, "run", fail)
+
+
+def _stored_files(directory):
+    return [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+
+
+def _download(resume_id: int, fmt: str):
+    from app.api.v1.endpoints.download import download_resume
+    from app.db.session import SessionLocal
+    from app.models import Resume, User
+
+    db = SessionLocal()
+    try:
+        user = db.get(User, db.get(Resume, resume_id).user_id)
+        return asyncio.run(download_resume(resume_id, format=fmt, current_user=user, db=db))
+    finally:
+        db.close()
+
+
+def _rewritten(resumes, docx_key=None) -> int:
+    from app.db.session import session_scope
+    from app.models import Resume
+
+    resume_id = resumes(1)[0]
+    with session_scope() as db:
+        resume = db.get(Resume, resume_id)
+        resume.analysis_result = {"rewritten_content": CONTENT, "rewrite_template": "professional"}
+        resume.s3_key_generated_docx = docx_key
+    return resume_id
+
+
+def _docx_key(resume_id: int):
+    from app.db.session import session_scope
+    from app.models import Resume
+
+    with session_scope() as db:
+        return db.get(Resume, resume_id).s3_key_generated_docx
+
+
+def test_stored_render_errors_keep_the_error_document(storage_dir, failing_renders):
+    from app.services.documents import is_failed_render, render_document
+
+    key = asyncio.run(render_document(CONTENT, "docx", "professional"))
+
+    assert is_failed_render(key)
+    assert _stored_files(storage_dir)
+
+
+def test_render_errors_can_be_raised_without_storing_anything(storage_dir, failing_renders):
+    from app.services.documents import render_document
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(render_document(CONTENT, "docx", "professional", store_errors=False))
+    assert _stored_files(storage_dir) == []
+
+
+def test_failed_lazy_render_is_not_saved_on_the_resume(resumes, storage_dir, failing_renders):
+    resume_id = _rewritten(resumes)
+
+    with pytest.raises(HTTPException) as raised:
+        _download(resume_id, "docx")
+
+    assert raised.value.status_code == 500
+    assert _docx_key(resume_id) is None
+
+
+def test_a_previously_failed_render_is_retried(resumes, storage_dir):
+    from app.services.documents import FAILED_RENDER_PREFIX, is_failed_render, render_pool
+
+    resume_id = _rewritten(resumes, docx_key=f"{FAILED_RENDER_PREFIX}stale.docx")
+    try:
+        response = _download(resume_id, "docx")
+    finally:
+        render_pool.shutdown()
+
+    key = _docx_key(resume_id)
+    assert key and not is_failed_render(key)
+    assert response.path.endswith(key)
@@ -0,0 +1,56 @@
+"""
+/health must stay fast while analyses are waiting on the LLM: provider calls
+are awaited on the event loop, never run as blocking SDK calls on it.
+"""
+import asyncio
+import time
+
+import httpx
+
+from tests.fake_provider import FakeProvider
+
+ANALYSES = 24
+PROVIDER_SECONDS = 1.0
+
+
+async def _run(resume_ids):
+    from app.api.v1.endpoints.analysis import process_analysis
+    from app.main import app
+    from app.services.llm_clients import llm_client_pool
+
+    jobs = asyncio.gather(*(
+        process_analysis(resume_id, {"openai": "test-key"}, "openai", None) for resume_id in resume_ids
+    ))
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        while not jobs.done():
+            started = time.perf_counter()
+            response = await client.get("/health")
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+            await asyncio.sleep(0.02)
+    await jobs
+    await llm_client_pool.close_all()
+    return sorted(latencies)
+
+
+def test_health_latency_stays_flat_while_analyses_run(resumes):
+    from app.db.session import session_scope
+    from app.models import Resume, ResumeStatus
+
+    resume_ids = resumes(ANALYSES)
+    with FakeProvider(delay=PROVIDER_SECONDS).serve() as provider:
+        started = time.perf_counter()
+        latencies = asyncio.run(_run(resume_ids))
+        elapsed = time.perf_counter() - started
+
+    with session_scope() as db:
+        statuses = {status for (status,) in db.query(Resume.status).filter(Resume.id.in_(resume_ids))}
+    assert statuses == {ResumeStatus.WAITING_INPUT}
+    assert provider.requests == ANALYSES
+    # Calls overlapped (up to the scheduler's per-key cap) instead of queuing behind each other
+    assert provider.max_in_flight > 1
+    assert elapsed < ANALYSES * PROVIDER_SECONDS / 2
+    # Probes kept being answered throughout, each within a few milliseconds
+    assert len(latencies) >= elapsed / 0.1
+    assert latencies[int(len(latencies) * 0.99)] < 0.1
@@ -0,0 +1,378 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_resilience import Hedger, RequestClock, _transient_exception_types
+
+
+@pytest.fixture
+def sdk_errors():
+    """Import the SDK error types is_retryable() checks before timing anything."""
+    _transient_exception_types()
+
+
+def _hedger(delay: float) -> Hedger:
+    hedger = Hedger(enabled=True, min_samples=1)
+    hedger._latencies[("p", "m")].record(delay)
+    return hedger
+
+
+def _request(queued: float, running: float, answer: str, clock: RequestClock):
+    """A call that waits `queued` seconds for its slot, then runs its request for `running`."""
+    async def call():
+        await asyncio.sleep(queued)
+        clock.start()
+        try:
+            await asyncio.sleep(running)
+        finally:
+            clock.stop()
+        return answer
+    return call
+
+
+def _run(hedger: Hedger, primary, backups):
+    def hedge():
+        backups.append(True)
+        backup_clock = RequestClock()
+        return "p", "m", _request(0, 0.01, "backup", backup_clock), backup_clock
+
+    async def main():
+        clock = RequestClock()
+        return await hedger.run(("p", "m", primary(clock), clock), hedge)
+    return asyncio.run(main())
+
+
+def test_slow_requests_are_hedged():
+    backups = []
+    result = _run(_hedger(0.05), lambda clock: _request(0, 1.0, "primary", clock), backups)
+
+    assert result == "backup"
+    assert backups
+
+
+def test_queue_wait_neither_triggers_hedges_nor_counts_as_latency():
+    hedger = _hedger(0.05)
+    backups = []
+    result = _run(hedger, lambda clock: _request(0.3, 0.01, "primary", clock), backups)
+
+    assert result == "primary"
+    assert backups == []
+    assert max(hedger._latencies[("p", "m")]._samples) < 0.1
+
+
+def test_retry_back_off_is_not_hedged():
+    def retried(clock):
+        async def call():
+            for running in (0.01, 0.01):
+                clock.start()
+                await asyncio.sleep(running)
+                clock.stop()
+                # Back-off before the next attempt
+                await asyncio.sleep(0.2)
+            return "primary"
+        return call
+
+    backups = []
+    assert _run(_hedger(0.05), retried, backups) == "primary"
+    assert backups == []
+
+
+def test_no_backup_is_sent_to_a_saturated_lane(monkeypatch):
+    from app.services import llm as llm_module
+    from app.services.llm import llm
+    from app.services.llm_scheduler import LLMScheduler
+
+    scheduler = LLMScheduler({"openai": 1}, shared=False)
+    monkeypatch.setattr(llm_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(llm_module, "LLM_HEDGE_TARGET", "same")
+    target = ("openai", "sk-test", "gpt-4o")
+
+    async def main():
+        assert llm._hedge_target("p", "s", [target], *target) is not None
+        async with scheduler.slot("openai", "sk-test"):
+            return llm._hedge_target("p", "s", [target], *target)
+
+    assert asyncio.run(main()) is None
+
+
+def test_a_hung_attempt_is_cut_off_at_the_retry_deadline(sdk_errors):
+    from app.services.llm_resilience import LLMRetrier
+
+    retrier = LLMRetrier(max_attempts=4, base_delay=0.01, deadline=0.3)
+    timeouts = []
+
+    async def hang(timeout):
+        timeouts.append(timeout)
+        await asyncio.wait_for(asyncio.sleep(60), timeout)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await retrier.run("openai", hang)
+        return loop.time() - started
+
+    assert asyncio.run(main()) < 0.5
+    assert timeouts[0] == pytest.approx(0.3, abs=0.05)
+
+
+def test_a_hung_provider_fails_generate_json_within_the_deadline(monkeypatch, sdk_errors):
+    from app.services import llm as llm_module
+    from app.services.llm import LLMService
+    from app.services.llm_resilience import CircuitBreakers, LLMRetrier
+
+    breakers = CircuitBreakers(min_calls=1)
+    monkeypatch.setattr(llm_module, "circuit_breakers", breakers)
+    monkeypatch.setattr(llm_module, "llm_retrier", LLMRetrier(base_delay=0.01, deadline=0.3))
+    monkeypatch.setattr(llm_module, "LLM_FAILOVER", False)
+
+    async def hang(self, *args):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(LLMService, "_call", hang)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await LLMService().generate_json("p", "s", {"openai": "sk-test"}, provider="openai", model="gpt-4o")
+        return loop.time() - started
+
+    assert asyncio.run(main()) < 0.5
+    # The timed-out call counted against the provider
+    assert breakers.get("openai", "gpt-4o").state == "open"
+
+
+class ProviderError(Exception):
+    def __init__(self, status: int, headers=None, details=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = type("Response", (), {"headers": headers or {}})()
+        self.details = details
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    from app.services import llm_resilience
+
+    fake = FakeTime()
+    monkeypatch.setattr(llm_resilience, "time", fake)
+    return fake
+
+
+def test_breaker_opens_at_the_failure_threshold(fake_time):
+    from app.services.llm_resilience import CircuitBreaker
+
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_threshold=0.5)
+    for failed in (False, True, False):
+        breaker.record(failed=failed, elapsed=1)
+    # Below min_calls nothing trips, even at 1/3 failures
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(failed=False, elapsed=1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(failed=True, elapsed=1)
+    # 2 of 5 failed: still below half
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(failed=True, elapsed=1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+
+
+def test_slow_calls_trip_the_breaker(fake_time):
+    from app.services.llm_resilience import CircuitBreaker
+
+    breaker = CircuitBreaker(min_calls=2, failure_threshold=0.5, slow_call_seconds=10)
+    breaker.record(failed=False, elapsed=1)
+    breaker.record(failed=False, elapsed=12)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def _open_breaker():
+    from app.services.llm_resilience import CircuitBreaker
+
+    breaker = CircuitBreaker(min_calls=1, cooldown=30)
+    breaker.record(failed=True, elapsed=1)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_lets_one_probe_through_after_the_cooldown_and_closes_on_success(fake_time):
+    breaker = _open_breaker()
+    fake_time.now += 29
+    assert not breaker.allow()
+
+    fake_time.now += 1
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    assert not breaker.available
+
+    breaker.record(failed=False, elapsed=1)
+    assert breaker.state == breaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_a_failed_probe_reopens_the_breaker_for_another_cooldown(fake_time):
+    breaker = _open_breaker()
+    fake_time.now += 30
+    assert breaker.allow()
+
+    breaker.record(failed=True, elapsed=1)
+    assert breaker.state == breaker.OPEN
+    assert breaker.trips == 2
+    fake_time.now += 29
+    assert not breaker.allow()
+    fake_time.now += 1
+    assert breaker.allow()
+
+
+def test_a_probe_released_without_a_verdict_can_be_retried(fake_time):
+    breaker = _open_breaker()
+    fake_time.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize(
+    "headers, details, expected",
+    [
+        ({"retry-after-ms": "1500"}, None, 1.5),
+        ({"retry-after": "7"}, None, 7.0),
+        ({"retry-after": "Thu, 01 Jan 1970 00:17:00 GMT"}, None, 20.0),
+        ({"retry-after": "soon"}, None, None),
+        ({}, [type("RetryInfo", (), {"retry_delay": type("Duration", (), {"seconds": 3, "nanos": 500_000_000})()})()], 3.5),
+        ({}, None, None),
+    ],
+)
+def test_retry_after_hints(fake_time, headers, details, expected):
+    from app.services.llm_resilience import retry_after
+
+    assert retry_after(ProviderError(429, headers, details)) == expected
+
+
+@pytest.fixture
+def providers(monkeypatch, sdk_errors):
+    """generate_json with fresh breakers, no retries and every provider's key; records calls."""
+    from app.services import llm as llm_module
+    from app.services.llm import LLMService
+    from app.services.llm_resilience import CircuitBreakers, LLMRetrier
+
+    monkeypatch.setattr(llm_module, "circuit_breakers", CircuitBreakers())
+    monkeypatch.setattr(llm_module, "llm_retrier", LLMRetrier(max_attempts=1))
+    monkeypatch.setattr(llm_module, "LLM_FAILOVER", True)
+    monkeypatch.setattr(llm_module.hedger, "enabled", False)
+
+    class Providers:
+        def __init__(self):
+            self.calls = []
+            self.failing = set()
+            self.keys = {"google": "g-key", "openai": "o-key", "anthropic": "a-key"}
+            self.breakers = llm_module.circuit_breakers
+
+        def generate(self, **kwargs):
+            answers = []
+            result = asyncio.run(LLMService().generate_json(
+                "p", "s", self.keys, on_answer=lambda *answer: answers.append(answer), **kwargs
+            ))
+            return result, answers
+
+    fake = Providers()
+
+    async def call(self, prompt, system_prompt, provider, api_key, model):
+        fake.calls.append(provider)
+        if provider in fake.failing:
+            raise ProviderError(503)
+        return {"provider": provider}
+
+    monkeypatch.setattr(LLMService, "_call", call)
+    return fake
+
+
+def test_failover_tries_the_other_providers_in_order(providers):
+    providers.failing = {"openai", "google"}
+    result, answers = providers.generate(provider="openai", model="gpt-4o")
+
+    assert providers.calls == ["openai", "google", "anthropic"]
+    assert result == {"provider": "anthropic"}
+    assert answers == [("anthropic", "claude-sonnet-4-5")]
+
+
+def test_failover_skips_providers_whose_circuit_is_open(providers):
+    providers.breakers.get("google", "gemini-2.5-flash")._open()
+    providers.failing = {"openai"}
+    result, _ = providers.generate(provider="openai", model="gpt-4o")
+
+    assert providers.calls == ["openai", "anthropic"]
+
+
+def test_caller_errors_are_not_failed_over(providers, monkeypatch):
+    from app.services.llm import LLMService
+
+    async def bad_request(self, prompt, system_prompt, provider, api_key, model):
+        providers.calls.append(provider)
+        raise ProviderError(400)
+
+    monkeypatch.setattr(LLMService, "_call", bad_request)
+    with pytest.raises(ProviderError):
+        providers.generate(provider="openai", model="gpt-4o")
+    assert providers.calls == ["openai"]
+
+
+def test_no_retry_or_failover_after_a_field_was_streamed(providers, monkeypatch):
+    from app.services import llm as llm_module
+    from app.services.llm import LLMService
+    from app.services.llm_resilience import LLMRetrier
+
+    monkeypatch.setattr(llm_module, "llm_retrier", LLMRetrier(max_attempts=4, base_delay=0.01))
+    fields = []
+
+    async def on_field(name, value):
+        fields.append(name)
+
+    async def stream(self, prompt, system_prompt, provider, api_key, model, on_field):
+        providers.calls.append(provider)
+        await on_field("score", 80)
+        raise ProviderError(503)
+
+    monkeypatch.setattr(LLMService, "_stream_json", stream)
+    with pytest.raises(ProviderError):
+        providers.generate(provider="openai", model="gpt-4o", on_field=on_field)
+    assert providers.calls == ["openai"]
+    assert fields == ["score"]
+
+
+def test_transient_errors_before_streaming_are_retried(providers, monkeypatch):
+    from app.services import llm as llm_module
+    from app.services.llm import LLMService
+    from app.services.llm_resilience import LLMRetrier
+
+    monkeypatch.setattr(llm_module, "llm_retrier", LLMRetrier(max_attempts=4, base_delay=0.01))
+
+    async def flaky(self, prompt, system_prompt, provider, api_key, model, on_field):
+        providers.calls.append(provider)
+        if len(providers.calls) < 3:
+            raise ProviderError(429, {"retry-after-ms": "10"})
+        await on_field("score", 80)
+        return {"score": 80}
+
+    monkeypatch.setattr(LLMService, "_stream_json", flaky)
+
+    async def on_field(name, value):
+        pass
+
+    result, answers = providers.generate(provider="openai", model="gpt-4o", on_field=on_field)
+    assert providers.calls == ["openai"] * 3
+    assert answers == [("openai", "gpt-4o")]
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import PRIORITY_PAID, PRIORITY_STANDARD, LLMScheduler
+
+
+async def _queue_calls(scheduler: LLMScheduler, calls, order):
+    """Hold the only slot while `calls` ((user, priority, name)...) queue up, then release it."""
+    async def call(user_id, priority, name):
+        with scheduler.tenant(user_id, priority):
+            async with scheduler.slot("openai", "sk-test"):
+                order.append(name)
+
+    async with scheduler.slot("openai", "sk-test"):
+        tasks = []
+        for user_id, priority, name in calls:
+            tasks.append(asyncio.ensure_future(call(user_id, priority, name)))
+            # Queue them in this order
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+def test_paid_calls_go_first_but_every_fourth_grant_is_standard():
+    scheduler = LLMScheduler({"openai": 1}, paid_share=3, shared=False)
+    order = []
+    calls = [(1, PRIORITY_STANDARD, f"s{n}") for n in range(2)] + [(2, PRIORITY_PAID, f"p{n}") for n in range(5)]
+
+    asyncio.run(_queue_calls(scheduler, calls, order))
+
+    assert order == ["p0", "p1", "p2", "s0", "p3", "p4", "s1"]
+
+
+def test_users_of_the_same_priority_take_turns():
+    scheduler = LLMScheduler({"openai": 1}, shared=False)
+    order = []
+    calls = [(1, PRIORITY_STANDARD, f"a{n}") for n in range(3)] + [(2, PRIORITY_STANDARD, "b0"), (3, PRIORITY_STANDARD, "c0")]
+
+    asyncio.run(_queue_calls(scheduler, calls, order))
+
+    assert order == ["a0", "b0", "c0", "a1", "a2"]
+
+
+def test_calls_cancelled_while_queued_give_up_their_place():
+    scheduler = LLMScheduler({"openai": 1}, shared=False)
+
+    async def main():
+        order = []
+
+        async def call(name):
+            async with scheduler.slot("openai", "sk-test"):
+                order.append(name)
+
+        async with scheduler.slot("openai", "sk-test"):
+            cancelled = asyncio.ensure_future(call("cancelled"))
+            waiting = asyncio.ensure_future(call("waiting"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+        await waiting
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        lane = scheduler._lane("openai", "sk-test")
+        return order, lane.in_flight, lane.queued()
+
+    assert asyncio.run(main()) == (["waiting"], 0, 0)
+
+
+def test_a_call_cancelled_as_its_slot_is_granted_passes_it_on():
+    scheduler = LLMScheduler({"openai": 1}, shared=False)
+
+    async def main():
+        order = []
+
+        async def call(name):
+            async with scheduler.slot("openai", "sk-test"):
+                order.append(name)
+
+        holder = scheduler.slot("openai", "sk-test")
+        await holder.__aenter__()
+        granted = asyncio.ensure_future(call("granted"))
+        waiting = asyncio.ensure_future(call("waiting"))
+        await asyncio.sleep(0)
+        # Release grants the slot to `granted`, which is cancelled before it runs
+        await holder.__aexit__(None, None, None)
+        granted.cancel()
+        await asyncio.gather(granted, waiting, return_exceptions=True)
+        return order, scheduler._lane("openai", "sk-test").in_flight
+
+    assert asyncio.run(main()) == (["waiting"], 0)
+
+
+def test_the_cap_holds_across_processes_sharing_redis(redis):
+    # Two processes, each allowed 2 calls locally, sharing a global cap of 2
+    schedulers = [LLMScheduler({"openai": 2}, shared=True, lease_seconds=30) for _ in range(2)]
+    running = []
+    peak = []
+
+    async def call(scheduler):
+        async with scheduler.slot("openai", "sk-test"):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+
+    async def body(client):
+        await asyncio.gather(*(call(schedulers[n % 2]) for n in range(8)))
+        return await client.zcard(next(iter(await client.keys("llm:slots:*")), "none"))
+
+    leases_left = redis(body)
+    assert max(peak) == 2
+    assert len(peak) == 8
+    assert leases_left == 0
+
+
+def test_expired_leases_free_their_slots(redis):
+    scheduler = LLMScheduler({"openai": 1}, shared=True, lease_seconds=30)
+
+    async def body(client):
+        # A crashed process left a lease that already expired
+        from app.services.llm_clients import hash_api_key
+        key = f"llm:slots:openai:{hash_api_key('sk-test')}"
+        await client.zadd(key, {"crashed": 1.0})
+        async with scheduler.slot("openai", "sk-test"):
+            return await client.zrange(key, 0, -1)
+
+    leases = redis(body)
+    assert "crashed" not in leases and len(leases) == 1
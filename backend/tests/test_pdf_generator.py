@@ -0,0 +1,62 @@
+import pytest
+
+
+@pytest.fixture
+def generator():
+    from app.services.pdf_generator import PDFGenerator
+    generator = PDFGenerator()
+    generator.unicode_font = False
+    return generator
+
+
+def test_ascii_text_is_returned_unchanged(generator):
+    text = "- Cut costs by 30% (\"fast path\")"
+
+    assert generator._clean_text(text) is text
+
+
+def test_punctuation_is_mapped_to_latin1(generator):
+    cleaned = generator._clean_text("• The “fast path” – 800ms → 120ms… team’s​ API")
+
+    assert cleaned == '- The "fast path" - 800ms -> 120ms... team\'s API'
+
+
+def test_characters_outside_latin1_lose_their_accents(generator):
+    # Dotless i has no decomposition to strip down to latin-1
+    assert generator._clean_text("Çağrı Şükrü, İstanbul") == "Çagr? Sükrü, Istanbul"
+
+
+def test_unicode_font_keeps_text(generator):
+    generator.unicode_font = True
+    text = "• Çağrı → İstanbul"
+
+    assert generator._clean_text(text) == text
+
+
+RESUME = {
+    "personal_info": {"name": "Test Candidate", "email": "test@example.com"},
+    "summary": "Senior engineer with a focus on reliable services.",
+    "experience": [{"title": "Senior Engineer", "company": "Acme", "dates": "2019 - 2024", "bullets": ["Cut costs by 30%"]}],
+    "skills": ["Python", "PostgreSQL"],
+}
+
+
+def test_latin1_resumes_use_core_helvetica(generator):
+    generator.unicode_font = True
+    pdf = bytes(generator.generate({**RESUME, "summary": "Café résumé, naïve façade."}, raise_errors=True))
+
+    assert b"/BaseFont /Helvetica" in pdf
+    assert b"/FontFile2" not in pdf
+
+
+def test_text_outside_latin1_embeds_the_unicode_font(generator):
+    from app.services.pdf_fonts import unicode_font_available
+
+    if not unicode_font_available():
+        pytest.skip("no Unicode TTF installed")
+    generator.unicode_font = True
+    resume = {**RESUME, "personal_info": {"name": "Çağrı Şükrü", "email": "test@example.com"}}
+    pdf = bytes(generator.generate(resume, raise_errors=True))
+
+    assert b"/FontFile2" in pdf
+    assert b"/BaseFont /Helvetica" not in pdf
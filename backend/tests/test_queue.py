@@ -0,0 +1,228 @@
+import json
+import asyncio
+
+import pytest
+
+from app.core import queue as queue_module
+from app.core.queue import JobQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(queue_module, "time", clock)
+    return clock
+
+
+def make_queue(dead=None, **kwargs) -> JobQueue:
+    job_queue = JobQueue(**{"visibility_timeout": 60, "max_attempts": 3, **kwargs})
+
+    async def on_dead(**payload):
+        dead.append(payload)
+
+    job_queue.register("jobs", lambda **payload: None, secret_fields=("api_keys",), on_dead=on_dead if dead is not None else None)
+    return job_queue
+
+
+async def _claim_ids(job_queue: JobQueue, clock: Clock, count: int):
+    claimed = []
+    for _ in range(count):
+        # Turns are ordered by when each user was last served
+        clock.now += 0.001
+        job = await job_queue.claim(["jobs"])
+        claimed.append(job and job[2]["n"])
+    return claimed
+
+
+def test_claimed_jobs_reappear_after_the_lease_expires(redis, clock):
+    job_queue = make_queue()
+
+    async def body(client):
+        job_id = await job_queue.enqueue("jobs", {"n": 1})
+        claimed = await job_queue.claim(["jobs"])
+        assert claimed[0] == job_id
+        assert await job_queue.claim(["jobs"]) is None
+
+        clock.now += 61
+        assert (await job_queue.claim(["jobs"]))[0] == job_id
+
+    redis(body)
+
+
+def test_extend_renews_the_lease(redis, clock):
+    job_queue = make_queue()
+
+    async def body(client):
+        await job_queue.enqueue("jobs", {"n": 1})
+        job_id = (await job_queue.claim(["jobs"]))[0]
+        clock.now += 50
+        await job_queue.extend("jobs", job_id)
+        clock.now += 50
+        assert await job_queue.claim(["jobs"]) is None
+        clock.now += 11
+        assert (await job_queue.claim(["jobs"]))[0] == job_id
+
+    redis(body)
+
+
+def test_release_makes_a_job_visible_immediately_and_ack_removes_it(redis, clock):
+    job_queue = make_queue()
+
+    async def body(client):
+        await job_queue.enqueue("jobs", {"n": 1})
+        job_id = (await job_queue.claim(["jobs"]))[0]
+        await job_queue.release("jobs", job_id)
+        assert (await job_queue.claim(["jobs"]))[0] == job_id
+
+        await job_queue.ack("jobs", job_id)
+        clock.now += 61
+        assert await job_queue.claim(["jobs"]) is None
+        assert await client.hlen("jobs:jobs:data") == 0
+        assert await client.hlen("jobs:jobs:attempts") == 0
+
+    redis(body)
+
+
+def test_jobs_over_max_attempts_are_dead_lettered_and_reported(redis, clock):
+    dead = []
+    job_queue = make_queue(dead, max_attempts=2)
+
+    async def body(client):
+        await job_queue.enqueue("jobs", {"n": 1, "resume_id": 7, "api_keys": {"openai": "sk-user"}})
+        for _ in range(2):
+            job_id, _, payload = await job_queue.claim(["jobs"])
+            # Worker crashed: the lease lapses
+            clock.now += 61
+        assert await job_queue.claim(["jobs"]) is None
+
+        assert dead == [{"n": 1, "resume_id": 7}]
+        dead_letters = [json.loads(raw) for raw in await client.lrange("jobs:jobs:dead", 0, -1)]
+        assert dead_letters == [{"n": 1, "resume_id": 7}]
+        assert await client.hlen("jobs:jobs:data") == 0
+        assert await client.exists(f"jobs:jobs:secret:{job_id}") == 0
+
+    redis(body)
+
+
+def test_a_failing_dead_letter_handler_does_not_stop_claims(redis, clock):
+    job_queue = make_queue(max_attempts=1)
+
+    async def explode(**payload):
+        raise RuntimeError("database down")
+
+    job_queue.dead_handlers["jobs"] = explode
+
+    async def body(client):
+        await job_queue.enqueue("jobs", {"n": 1})
+        await job_queue.claim(["jobs"])
+        clock.now += 61
+        await job_queue.enqueue("jobs", {"n": 2})
+        assert (await job_queue.claim(["jobs"]))[2] == {"n": 2}
+
+    redis(body)
+
+
+def test_secrets_are_stored_encrypted_and_dropped_on_ack(redis, clock):
+    job_queue = make_queue()
+
+    async def body(client):
+        job_id = await job_queue.enqueue("jobs", {"n": 1, "api_keys": {"openai": "sk-user-secret"}})
+        for key in await client.keys("*"):
+            dump = json.dumps(
+                await client.hgetall(key) if await client.type(key) == "hash"
+                else await client.zrange(key, 0, -1) if await client.type(key) == "zset"
+                else await client.get(key)
+            )
+            assert "sk-user-secret" not in dump
+        assert await client.ttl(f"jobs:jobs:secret:{job_id}") == job_queue.secret_ttl
+
+        _, _, payload = await job_queue.claim(["jobs"])
+        assert payload == {"n": 1, "api_keys": {"openai": "sk-user-secret"}}
+
+        await job_queue.ack("jobs", job_id)
+        assert await client.exists(f"jobs:jobs:secret:{job_id}") == 0
+
+    redis(body)
+
+
+def test_users_take_turns(redis, clock):
+    job_queue = make_queue()
+
+    async def body(client):
+        for n in range(3):
+            await job_queue.enqueue("jobs", {"n": f"a{n}", "user_id": 1})
+            clock.now += 1
+        await job_queue.enqueue("jobs", {"n": "b0", "user_id": 2})
+        await job_queue.enqueue("jobs", {"n": "c0", "user_id": 3})
+
+        assert await _claim_ids(job_queue, clock, 6) == ["a0", "b0", "c0", "a1", "a2", None]
+        assert (await job_queue.stats())["jobs"]["in_flight"] == 5
+
+    redis(body)
+
+
+def test_dead_analysis_marks_the_resume_failed(resumes):
+    from app.api.v1.endpoints.analysis import fail_dead_analysis
+    from app.db.session import session_scope
+    from app.models import Resume, ResumeStatus
+
+    resume_id = resumes(1)[0]
+    with session_scope() as db:
+        db.get(Resume, resume_id).status = ResumeStatus.ANALYZING
+
+    asyncio.run(fail_dead_analysis(resume_id=resume_id, user_id=1, priority="standard"))
+
+    with session_scope() as db:
+        resume = db.get(Resume, resume_id)
+        assert resume.status == ResumeStatus.FAILED
+        assert resume.analysis_result["error"]
+
+
+def test_dead_rewrite_leaves_finished_resumes_alone(resumes):
+    from app.api.v1.endpoints.rewrite import fail_dead_rewrite
+    from app.db.session import session_scope
+    from app.models import Resume, ResumeStatus
+
+    generating, completed = resumes(2)
+    with session_scope() as db:
+        db.get(Resume, generating).status = ResumeStatus.GENERATING
+        db.get(Resume, completed).status = ResumeStatus.COMPLETED
+
+    for resume_id in (generating, completed):
+        asyncio.run(fail_dead_rewrite(resume_id=resume_id, answers={}, template="professional"))
+
+    with session_scope() as db:
+        assert db.get(Resume, generating).status == ResumeStatus.FAILED
+        assert db.get(Resume, generating).analysis_result["rewrite_error"]
+        assert db.get(Resume, completed).status == ResumeStatus.COMPLETED
+
+
+def test_standard_jobs_get_every_fourth_claim(redis, clock):
+    job_queue = make_queue(priority_share=3)
+
+    async def body(client):
+        # Idle polls before any job exists must not shift the share
+        for _ in range(5):
+            assert await job_queue.claim(["jobs"]) is None
+        for n in range(6):
+            await job_queue.enqueue("jobs", {"n": f"p{n}", "user_id": 1, "priority": "paid"})
+            clock.now += 1
+        for n in range(3):
+            await job_queue.enqueue("jobs", {"n": f"s{n}", "user_id": 2, "priority": "standard"})
+            clock.now += 1
+
+        claimed = await _claim_ids(job_queue, clock, 4)
+        # Idle polls in the middle (e.g. of another worker) change nothing either
+        assert await job_queue.claim(["other"]) is None
+        claimed += await _claim_ids(job_queue, clock, 5)
+        assert claimed == ["p0", "p1", "p2", "s0", "p3", "p4", "p5", "s1", "s2"]
+
+    redis(body)
@@ -0,0 +1,84 @@
+import io
+import os
+
+import pytest
+
+from tests.factories import make_docx, make_pdf
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    from app.utils import text_extractor
+    yield text_extractor
+    text_extractor.extraction_pool.shutdown()
+
+
+def test_parallel_pdf_extraction_matches_serial_in_page_order(extractor, monkeypatch):
+    pdf = make_pdf(40)
+    monkeypatch.setattr(extractor, "PARALLEL_MIN_PAGES", 10 ** 6)
+    serial = extractor.read_pdf(io.BytesIO(pdf), max_chars=10 ** 9)
+
+    parallel = extractor.read_pdf_pooled(io.BytesIO(pdf), 40, max_chars=10 ** 9)
+
+    assert parallel.text == serial.text
+    assert parallel.page_count == 40
+    assert parallel.skipped_pages == []
+    assert serial.text.index("Page 1 line 1:") < serial.text.index("Page 40 line 40:")
+
+
+def test_shards_carry_the_file_path_not_its_bytes(extractor, monkeypatch, tmp_path):
+    submitted = []
+    submit = extractor.extraction_pool.submit
+
+    def record(fn, *args):
+        submitted.append(args)
+        return submit(fn, *args)
+
+    monkeypatch.setattr(extractor.extraction_pool, "submit", record)
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(make_pdf(20))
+
+    with open(path, "rb") as f:
+        on_disk = extractor.read_pdf_pooled(f, 20, max_chars=10 ** 9)
+    spooled = extractor.read_pdf_pooled(io.BytesIO(path.read_bytes()), 20, max_chars=10 ** 9)
+
+    assert on_disk.text == spooled.text
+    assert all(isinstance(args[0], str) for args in submitted)
+    # A local file is read where it is; a stream is spooled once, then removed
+    paths = {args[0] for args in submitted}
+    assert str(path) in paths and len(paths) == 2
+    assert all(os.path.exists(p) == (p == str(path)) for p in paths)
+
+
+def test_small_pdfs_are_extracted_in_process(extractor, monkeypatch):
+    def fail(*args):
+        raise AssertionError("a 2-page PDF went to the process pool")
+
+    monkeypatch.setattr(extractor, "read_pdf_pooled", fail)
+    result = extractor.read_pdf(io.BytesIO(make_pdf(2)))
+
+    assert "Page 2 line 40:" in result.text
+    assert result.page_count == 2
+
+
+def test_parallel_extraction_stops_at_the_character_budget(extractor):
+    result = extractor.read_pdf_pooled(io.BytesIO(make_pdf(100)), 100, max_chars=5000)
+
+    assert len(result.text) == 5000
+    assert result.text.startswith("Page 1 line 1:")
+
+
+def test_docx_extraction_matches_python_docx(extractor):
+    from docx import Document
+
+    data = make_docx(300)
+    expected = "\n".join(p.text for p in Document(io.BytesIO(data)).paragraphs)
+
+    assert extractor.read_docx(io.BytesIO(data)).text == expected
+
+
+def test_docx_extraction_stops_at_the_character_budget(extractor):
+    result = extractor.read_docx(io.BytesIO(make_docx(1000)), max_chars=2000)
+
+    assert len(result.text) == 2000
+    assert result.text.startswith("Paragraph 1:")